@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from stock_app.static.finance_py.const import PRICE_HISTORY_START
+from stock_app.static.finance_py.correlation import build
+
+
+class Command(BaseCommand):
+    help = ('Dựng / cập nhật thống kê tương quan lợi suất của toàn bộ mã niêm yết (và các mã ngoài danh sách '
+            'đã được hỏi) trong thư mục cache. Chạy định kỳ bằng cron sau phiên; /stock-correlation/ chỉ đọc '
+            'thống kê này, không cộng phiên mới.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-date', default=PRICE_HISTORY_START)
+
+    def handle(self, *args, **options):
+        state = build(options['from_date'])
+        self.stdout.write(f"Correlation statistics: {len(state['symbols'])} symbols through {state['through']}")
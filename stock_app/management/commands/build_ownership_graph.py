@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from stock_app.static.finance_py.const import OWNERSHIP_MAX_WORKERS
+from stock_app.static.finance_py.ownership_graph import build_and_save
+
+
+class Command(BaseCommand):
+    help = ('Tải công ty con (SSI) của toàn bộ mã niêm yết và dựng đồ thị sở hữu chéo dạng CSR trong thư mục cache. '
+            'Các truy vấn kiểm soát / sở hữu hiệu dụng sau đó chỉ đọc đồ thị này.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', default='', help='Danh sách mã cách nhau bởi dấu phẩy; mặc định toàn bộ mã')
+        parser.add_argument('--workers', type=int, default=OWNERSHIP_MAX_WORKERS)
+
+    def handle(self, *args, **options):
+        symbols = [code for code in options['symbols'].split(',') if code.strip()] or None
+        graph = build_and_save(symbols, max_workers=options['workers'])
+        self.stdout.write(f"Ownership graph: {len(graph)} entities, {len(graph.indices)} holdings")
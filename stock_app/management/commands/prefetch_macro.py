@@ -0,0 +1,47 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from stock_app.static.finance_py.const import MACRO_FETCH_MODE, MACRO_PREFETCH_START_YEAR, MACRO_PREFETCH_TYPES
+from stock_app.static.finance_py.finance_df import MACRO_REPORT_URLS, macro_reports
+
+
+class Command(BaseCommand):
+    help = ('Tải sẵn các báo cáo vĩ mô vietstock (CPI, bán lẻ, SXCN, XNK, FDI, tín dụng) vào kho macro_store. '
+            'Chạy định kỳ bằng cron, hoặc dùng --interval để lặp lại trong một tiến trình.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', nargs='+', choices=list(MACRO_REPORT_URLS), default=list(MACRO_REPORT_URLS))
+        parser.add_argument('--types', nargs='+', default=list(MACRO_PREFETCH_TYPES))
+        parser.add_argument('--from-year', type=int, default=MACRO_PREFETCH_START_YEAR)
+        parser.add_argument('--mode', choices=['auto', 'http', 'browser'], default=MACRO_FETCH_MODE)
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Số giây giữa hai lần tải; 0 là chỉ tải một lần')
+
+    def handle(self, *args, **options):
+        if options['interval'] < 0:
+            raise CommandError('--interval must be >= 0')
+        while True:
+            self.prefetch(options)
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def prefetch(self, options):
+        # Tải cả khoảng từ năm bắt đầu đến năm nay; yêu cầu khoảng con sau đó được cắt từ kho.
+        # Các báo cáo cùng loại được tải chung một lượt (HTTP song song hoặc các tab của một Chrome).
+        to_year = datetime.now().year
+        urls = {name: MACRO_REPORT_URLS[name] for name in options['reports']}
+        for report_type in options['types']:
+            try:
+                frames = macro_reports(report_type, options['from_year'], to_year, urls=urls,
+                                       mode=options['mode'], refresh=True)
+            except Exception as e:
+                self.stderr.write(f"Error prefetching type {report_type}: {e}")
+                continue
+            for name in urls:
+                if name in frames:
+                    self.stdout.write(f"{name} (type {report_type}): {len(frames[name])} rows")
+                else:
+                    self.stderr.write(f"Error prefetching {name} (type {report_type})")
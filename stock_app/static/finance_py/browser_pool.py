@@ -0,0 +1,151 @@
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from stock_app.static.finance_py.const import BROWSER_MAX_USES, BROWSER_POOL_SIZE
+
+
+def _chrome_options():
+    # Cấu hình Chrome cho chế độ không hiển thị
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')  # Chạy ở chế độ không hiển thị
+    chrome_options.add_argument('--no-sandbox')  # Bỏ qua sandbox
+    chrome_options.add_argument('--disable-dev-shm-usage')  # Khắc phục lỗi shared memory
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('blink-settings=imagesEnabled=false')  # Tắt tải hình ảnh
+    return chrome_options
+
+
+class _Browser:
+    def __init__(self):
+        self.driver = webdriver.Chrome(options=_chrome_options())
+        self.uses = 0
+
+    def healthy(self):
+        try:
+            return self.driver.execute_script('return 1') == 1
+        except WebDriverException:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class BrowserPool:
+    """Nhóm Chrome headless dùng chung giữa các lần gọi.
+
+    Tổng số trình duyệt (đang dùng + đang rảnh) không vượt quá `size`, các request khác chờ đến lượt.
+    Mỗi trình duyệt được kiểm tra còn sống trước khi dùng và được khởi động lại sau `max_uses` lần dùng
+    để bộ nhớ của Chrome không tăng mãi.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES):
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._alive = 0
+        self._warmed = False
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Giữ chỗ cho một trình duyệt mới nếu chưa đủ `size`
+        with self._lock:
+            if self._alive >= self.size:
+                return False
+            self._alive += 1
+            return True
+
+    def _start(self):
+        try:
+            return _Browser()
+        except BaseException:
+            self._discard(None)
+            raise
+
+    def _discard(self, browser):
+        if browser is not None:
+            browser.quit()
+        with self._lock:
+            self._alive -= 1
+
+    def _take(self):
+        # Ưu tiên trình duyệt đang rảnh, bỏ các trình duyệt đã chết
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                if self._reserve():
+                    return self._start()
+                # Đã đủ số trình duyệt: chờ một trình duyệt đang khởi động hoặc đang được trả lại
+                try:
+                    browser = self._idle.get(timeout=1)
+                except queue.Empty:
+                    continue
+            if browser.healthy():
+                return browser
+            self._discard(browser)
+
+    def _reset(self, browser):
+        # Xóa cookie của lần dùng trước; trình duyệt lỗi thì không trả lại nhóm
+        try:
+            browser.driver.delete_all_cookies()
+            return True
+        except WebDriverException:
+            return False
+
+    def _warm(self):
+        # Khởi động sẵn các trình duyệt còn lại ở nền để các request sau không phải chờ Chrome khởi động
+        for _ in range(self.size - 1):
+            if not self._reserve():
+                return
+            try:
+                self._idle.put(self._start())
+            except WebDriverException as e:
+                print(f"Error starting browser: {e}")
+                return
+
+    @contextmanager
+    def driver(self):
+        """Mượn một WebDriver; trả lại nhóm khi xong, bỏ đi nếu bị lỗi hoặc đã dùng đủ số lần"""
+        with self._lock:
+            if not self._warmed:
+                self._warmed = True
+                threading.Thread(target=self._warm, daemon=True).start()
+
+        with self._slots:
+            browser = self._take()
+            browser.uses += 1
+            try:
+                yield browser.driver
+                if browser.uses < self.max_uses and self._reset(browser):
+                    self._idle.put(browser)
+                    browser = None
+            finally:
+                if browser is not None:
+                    self._discard(browser)
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+_POOL = BrowserPool()
+atexit.register(_POOL.close)
+
+def driver():
+    """WebDriver mượn từ nhóm dùng chung của process (dùng với `with`)"""
+    return _POOL.driver()
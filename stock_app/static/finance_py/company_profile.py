@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from stock_app.static.finance_py import finance_df
+from stock_app.static.finance_py.const import PROFILE_MAX_WORKERS, PROFILE_TIMEOUT, PROFILE_TTLS
+
+# Các nguồn của hồ sơ công ty: tên -> hàm tải theo mã
+SOURCES = {
+    'overview': finance_df.company_overview,  # TCBS
+    'sub_companies': finance_df.sub_company,  # SSI
+    'shareholders': finance_df.share_holder,  # SSI
+}
+
+# Dùng chung giữa các request: nguồn chậm vẫn tải tiếp ở nền sau khi hồ sơ đã trả về
+_executor = ThreadPoolExecutor(max_workers=PROFILE_MAX_WORKERS)
+
+_cache = {}  # (symbol, source) -> (fetched_at, DataFrame)
+_inflight = {}  # (symbol, source) -> Future đang tải
+_lock = threading.Lock()
+
+
+def _fetch(key):
+    symbol, source = key
+    try:
+        df = SOURCES[source](symbol)
+        with _lock:
+            _cache[key] = (time.time(), df)
+        return df
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+def _submit(key):
+    # Một mã / nguồn chỉ tải một lần dù nhiều request cùng hỏi
+    with _lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _inflight[key] = _executor.submit(_fetch, key)
+    return future
+
+def _cached(key):
+    with _lock:
+        return _cache.get(key)
+
+def profile(symbol, timeout=PROFILE_TIMEOUT, sources=None):
+    """Hồ sơ công ty gộp từ các nguồn trong SOURCES, tải song song.
+
+    Mỗi nguồn được dùng lại trong PROFILE_TTLS[nguồn] giây. Nguồn hết hạn được tải lại; nếu quá
+    `timeout` giây hoặc bị lỗi thì dùng bản đã lưu (kể cả đã hết hạn). Trả về dict gồm symbol, một
+    DataFrame (hoặc None) cho mỗi nguồn, 'stale' (các nguồn đang dùng bản cũ) và 'errors' {nguồn: lỗi}.
+    """
+    symbol = symbol.strip().upper()
+    sources = list(SOURCES) if sources is None else sources
+    for source in sources:
+        if source not in SOURCES:
+            raise ValueError(f"Unknown profile source: {source}")
+
+    result = {'symbol': symbol, 'stale': [], 'errors': {}}
+    now = time.time()
+    futures = {}
+    for source in sources:
+        cached = _cached((symbol, source))
+        if cached is not None and now - cached[0] < PROFILE_TTLS[source]:
+            result[source] = cached[1]
+        else:
+            futures[source] = _submit((symbol, source))
+
+    # Chờ tất cả các nguồn cùng lúc: thời gian chờ bằng nguồn chậm nhất, tối đa `timeout`
+    wait(futures.values(), timeout=timeout)
+    for source, future in futures.items():
+        if future.done() and future.exception() is None:
+            result[source] = future.result()
+            continue
+        error = 'timeout' if not future.done() else str(future.exception())
+        print(f"Error fetching {source} for {symbol}: {error}")
+        cached = _cached((symbol, source))
+        if cached is not None:
+            result[source] = cached[1]
+            result['stale'].append(source)
+        else:
+            result[source] = None
+            result['errors'][source] = error
+    return result
@@ -1,9 +1,105 @@
+import os
+import random
+import tempfile
+
 from fake_useragent import UserAgent
 
 
 base_url = 'https://apipubaws.tcbs.com.vn'
 analysis_url = 'tcanalysis'
 
+# Thư mục lưu dữ liệu cache trên đĩa (có thể đổi bằng biến môi trường FINANCE_CACHE_DIR)
+CACHE_DIR = os.environ.get('FINANCE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'finance_py'))
+
+# Số request chạy song song tối đa khi lấy tỷ giá theo từng ngày
+EXCHANGE_RATE_MAX_WORKERS = 8
+
+# Số request chạy song song tối đa khi lấy giá vàng SJC theo từng ngày
+GOLD_MAX_WORKERS = 8
+
+# Kích thước trang lớn nhất khi lấy giá cổ phiếu từ vndirect và số trang tải song song
+VNDIRECT_PAGE_SIZE = 1000
+PRICE_MAX_WORKERS = 8
+
+# Số mã được tải giá đồng thời tối đa trong toàn bộ process (dùng chung cho mọi request lấy nhiều mã)
+PANEL_MAX_CONCURRENCY = 16
+
+# Ngày bắt đầu khi tải toàn bộ lịch sử giá của một mã vào kho OHLCV
+PRICE_HISTORY_START = '2000-01-01'
+
+# Số file giá (memory-map) của kho OHLCV giữ mở cùng lúc; mã ít dùng nhất được đóng trước
+OHLCV_MMAP_CACHE_SIZE = 256
+
+# Số mã ngoài danh sách niêm yết giữ tối đa trong thống kê tương quan; mã lâu không được hỏi nhất bị bỏ trước
+CORRELATION_CUSTOM_MAX_SYMBOLS = 200
+
+# Thời gian giữ mẫu dòng báo cáo tài chính (financial_models) đã lưu, tính bằng giây.
+# Mẫu chỉ đổi khi có thông tư kế toán mới nên có thể giữ lâu.
+STATEMENT_LAYOUT_TTL = 30 * 24 * 3600
+
+# Kỳ báo cáo đã hỏi nhưng chưa có số liệu (chưa công bố) được hỏi lại sau khoảng thời gian này, tính bằng giây.
+# Kỳ đã có số liệu không bao giờ tải lại.
+STATEMENT_EMPTY_TTL = 12 * 3600
+
+# Số mã được tải báo cáo tài chính song song khi so sánh nhiều mã
+STATEMENT_MAX_WORKERS = 8
+
+# Nhóm Chrome headless dùng cho các báo cáo vĩ mô: số trình duyệt tối đa, số lần dùng trước khi
+# khởi động lại và thời gian chờ bảng dữ liệu tối đa (giây)
+BROWSER_POOL_SIZE = 2
+BROWSER_MAX_USES = 50
+MACRO_PAGE_TIMEOUT = 20
+
+# Cách lấy báo cáo vĩ mô: 'auto' (gửi form bằng HTTP, lỗi thì dùng Chrome), 'http' hoặc 'browser'
+MACRO_FETCH_MODE = 'auto'
+
+# Thời gian dùng lại báo cáo vĩ mô đã tải (số liệu cập nhật tối đa mỗi tháng), tính bằng giây.
+# Lệnh prefetch_macro tải lại trước khi hết hạn; năm bắt đầu và các loại báo cáo (2 = theo tháng) được tải sẵn.
+MACRO_CACHE_TTL = 7 * 24 * 3600
+MACRO_PREFETCH_START_YEAR = 2010
+MACRO_PREFETCH_TYPES = ('1', '2')
+
+# Danh sách mã niêm yết (vietcap) được tải lại sau khoảng thời gian này, tính bằng giây.
+# Trong lúc tải lại ở nền, các request vẫn dùng chỉ mục cũ.
+LISTING_TTL = 24 * 3600
+
+# Hồ sơ công ty: thời gian dùng lại từng nguồn (giây), thời gian chờ tối đa của một hồ sơ (giây)
+# và số request nguồn chạy song song. Quá thời gian chờ thì dùng bản đã lưu, nguồn vẫn tải tiếp ở nền.
+PROFILE_TTLS = {
+    'overview': 3600,  # deltaInWeek / deltaInMonth / deltaInYear đổi theo giá hằng ngày
+    'sub_companies': 7 * 24 * 3600,
+    'shareholders': 7 * 24 * 3600,
+}
+PROFILE_TIMEOUT = 5
+PROFILE_MAX_WORKERS = 8
+
+# Đồ thị sở hữu chéo: số mã tải công ty con song song khi dựng đồ thị, số bước tối đa khi tra cứu
+# và tỷ lệ sở hữu tối thiểu (0-1) để coi là nắm quyền kiểm soát
+OWNERSHIP_MAX_WORKERS = 16
+OWNERSHIP_MAX_HOPS = 5
+OWNERSHIP_CONTROL_THRESHOLD = 0.5
+
+# Cấu hình session HTTP dùng chung cho từng nguồn dữ liệu:
+# pool_size là số kết nối keep-alive giữ lại, timeout là (connect, read) tính bằng giây
+HTTP_POOLS = {
+    'vndirect': {'pool_size': 16, 'timeout': (5, 30)},
+    'vietcombank': {'pool_size': 16, 'timeout': (5, 20)},
+    'sjc': {'pool_size': 16, 'timeout': (5, 20)},
+    'ssi': {'pool_size': 8, 'timeout': (5, 20)},
+    'vietcap': {'pool_size': 4, 'timeout': (5, 60)},
+    'tcbs': {'pool_size': 8, 'timeout': (5, 20)},
+    'vietstock': {'pool_size': 4, 'timeout': (5, 20)},
+}
+
+# Giới hạn tốc độ theo nguồn dữ liệu: (số request mỗi giây, số request dồn tối đa)
+HOST_RATE_LIMITS = {
+    'sjc': (4, 8),
+    'ssi': (20, 40),
+}
+
+# Số User-Agent ngẫu nhiên được tạo sẵn khi khởi động
+USER_AGENT_POOL_SIZE = 50
+
 DEFAULT_HEADERS = {
             'Accept': 'application/json, text/plain, */*',
             'Content-Type': 'application/json',
@@ -22,12 +118,17 @@ DEFAULT_HEADERS = {
             'Pragma': 'no-cache',
         }
 
-def get_headers(random_agent=True):
-   
+def _build_user_agents():
+    # Chỉ tạo UserAgent một lần khi khởi động vì mỗi lần tạo đều phải đọc file dữ liệu
     ua = UserAgent(fallback='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36')
+    return [ua.random for _ in range(USER_AGENT_POOL_SIZE)], ua.chrome
+
+USER_AGENTS, CHROME_USER_AGENT = _build_user_agents()
+
+def get_headers(random_agent=True):
     headers = DEFAULT_HEADERS.copy()
     if random_agent:
-        headers['User-Agent'] = ua.random
+        headers['User-Agent'] = random.choice(USER_AGENTS)
     else:
-        headers['User-Agent'] = ua.chrome
-    return headers
\ No newline at end of file
+        headers['User-Agent'] = CHROME_USER_AGENT
+    return headers
@@ -0,0 +1,292 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from stock_app.static.finance_py import finance_df, ohlcv_store, vn_calendar
+from stock_app.static.finance_py.const import CORRELATION_CUSTOM_MAX_SYMBOLS, PRICE_HISTORY_START
+from stock_app.static.finance_py.storage import cache_path
+
+# Thống kê đủ của lợi suất log cho từng cặp mã, chỉ cộng trên các ngày cả hai mã đều có lợi suất:
+# n (số ngày chung), sx[i, j] (tổng lợi suất mã i trên ngày chung với j), sxx (tổng bình phương),
+# sxy (tổng tích). Các tổng này cộng dồn được nên khi có phiên mới chỉ cần cộng thêm các dòng mới.
+STAT_NAMES = ('n', 'sx', 'sxx', 'sxy')
+
+# Thống kê được lưu theo tên tập mã (universe) và ngày bắt đầu, không theo danh sách mã cụ thể:
+# ALL là toàn bộ mã niêm yết (dựng bằng lệnh build_correlation), các ngành và danh sách mã được cắt ra
+# từ đó; CUSTOM gom các mã được hỏi nhưng không có trong ALL (có giới hạn số mã). Mã mới được thêm hàng / cột
+# vào ma trận; chỉ lệnh build_correlation cộng các phiên mới, request chỉ đọc thống kê.
+ALL = 'all'
+CUSTOM = 'custom'
+
+_states = {}  # (universe, fromdate) -> (mtime file, dict thống kê đã nạp)
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+def _state_path(key):
+    directory = cache_path('correlation')
+    os.makedirs(directory, exist_ok=True)
+    name, fromdate = key
+    return os.path.join(directory, f'{name}_{fromdate}.npz')
+
+def _empty_state(symbols):
+    size = len(symbols)
+    state = {name: np.zeros((size, size)) for name in STAT_NAMES}
+    state.update(symbols=np.array(symbols, dtype=str), through=None, last_close=np.full(size, np.nan),
+                 used=np.zeros(size))
+    return state
+
+def _load_state(key):
+    """Thống kê đã lưu của `key`, None nếu chưa dựng. Đọc lại khi file đổi (lệnh build_correlation
+    chạy ở process khác)"""
+    path = _state_path(key)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _states.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with np.load(path, allow_pickle=False) as saved:
+        state = {name: saved[name] for name in saved.files}
+    state['through'] = str(state['through']) or None
+    state.setdefault('used', np.zeros(len(state['symbols'])))
+    _states[key] = (mtime, state)
+    return state
+
+def _save_state(key, state):
+    path = _state_path(key)
+    tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(tmp_path, **dict(state, through=state['through'] or ''))
+    os.replace(tmp_path, path)
+    _states[key] = (os.stat(path).st_mtime_ns, state)
+
+def log_returns(closes, last_close=None):
+    """Ma trận lợi suất log (ngày x mã) từ bảng giá đóng cửa đã căn theo ngày.
+
+    Lợi suất chỉ được tính khi mã có giá ở cả phiên này và phiên liền trước của bảng,
+    ngược lại là NaN (không điền giá cũ). `last_close` là giá của phiên liền trước dòng đầu tiên.
+    """
+    values = closes.to_numpy(dtype='f8')
+    previous = np.vstack([
+        np.full((1, values.shape[1]), np.nan) if last_close is None else last_close[None, :],
+        values[:-1],
+    ])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.log(values / previous)
+    returns[~np.isfinite(returns)] = np.nan
+    return pd.DataFrame(returns, index=closes.index, columns=closes.columns)
+
+def _pair_stats(returns_a, returns_b):
+    """Thống kê của các cặp (mã cột của returns_a, mã cột của returns_b) trên cùng các ngày (bỏ qua NaN)"""
+    mask_a, mask_b = np.isfinite(returns_a), np.isfinite(returns_b)
+    values_a, values_b = np.where(mask_a, returns_a, 0.0), np.where(mask_b, returns_b, 0.0)
+    weights_a, weights_b = mask_a.astype('f8'), mask_b.astype('f8')
+    return dict(
+        n=weights_a.T @ weights_b,
+        sx=values_a.T @ weights_b,
+        sxx=(values_a * values_a).T @ weights_b,
+        sxy=values_a.T @ values_b,
+    )
+
+def _accumulate(state, returns):
+    """Thống kê mới = `state` + các dòng lợi suất mới (bỏ qua NaN theo từng cặp).
+
+    Trả về dict mới thay vì sửa tại chỗ để các request đang đọc `state` không thấy số liệu dở dang.
+    """
+    added = _pair_stats(returns, returns)
+    return dict(state, **{name: state[name] + added[name] for name in STAT_NAMES})
+
+def _reshape(state, symbols, fromdate):
+    """Thống kê cho tập mã mới `symbols`: bỏ hàng / cột của mã không còn trong tập, thêm hàng / cột cho
+    mã mới tính trên các phiên đã cộng [fromdate, through]. Chỉ tải giá của mã mới, giá các mã cũ
+    đọc từ kho OHLCV đã lưu."""
+    old = state['symbols'].tolist()
+    position = {symbol: i for i, symbol in enumerate(old)}
+    added = [symbol for symbol in symbols if symbol not in position]
+    if not added and len(symbols) == len(old):
+        return state
+
+    keep = np.array([position.get(symbol, -1) for symbol in symbols], dtype=int)
+    kept = keep >= 0
+    resized = _empty_state(symbols)
+    for name in STAT_NAMES:
+        resized[name][np.ix_(kept, kept)] = state[name][np.ix_(keep[kept], keep[kept])]
+    for name in ('last_close', 'used'):
+        resized[name][kept] = state[name][keep[kept]]
+    resized['through'] = state['through']
+    if not added or state['through'] is None:
+        return resized
+
+    # Chỉ tính các cặp có mã mới, trên cùng khoảng phiên với các cặp cũ
+    closes = pd.concat([
+        _stored_closes([symbol for symbol in symbols if symbol in position], fromdate, state['through']),
+        _closes(added, fromdate, state['through']),
+    ], axis=1).reindex(columns=symbols).sort_index()
+    if not len(closes):
+        return resized
+    returns = log_returns(closes).to_numpy()
+    new = np.flatnonzero(~kept)
+    columns = _pair_stats(returns, returns[:, new])
+    rows = _pair_stats(returns[:, new], returns)
+    for name in STAT_NAMES:
+        resized[name][:, new] = columns[name]
+        resized[name][new, :] = rows[name]
+    if closes.index[-1].strftime('%Y-%m-%d') == state['through']:
+        resized['last_close'][new] = closes.iloc[-1].to_numpy(dtype='f8')[new]
+    return resized
+
+def _closes(symbols, fromdate, todate):
+    """Bảng giá đóng cửa (ngày x mã) lấy từ kho giá đã lưu, tải thêm nếu còn thiếu"""
+    panel = finance_df.price_panel(symbols, fromdate, todate, layout='wide')
+    if panel.empty:
+        return pd.DataFrame(columns=symbols, dtype='f8')
+    return panel['close'].reindex(columns=symbols).sort_index()
+
+def _stored_closes(symbols, fromdate, todate):
+    """Bảng giá đóng cửa (ngày x mã) chỉ đọc từ kho OHLCV, không tải thêm"""
+    series = {}
+    for symbol in symbols:
+        bars = ohlcv_store.read(symbol, fromdate, todate)
+        series[symbol] = pd.Series(bars['close'], index=pd.DatetimeIndex(bars['date'].astype('M8[ns]')))
+    return pd.DataFrame(series, columns=symbols, dtype='f8').sort_index()
+
+def _last_session():
+    """Phiên HOSE đã đóng gần nhất (không tính hôm nay vì giá trong phiên còn thay đổi)"""
+    yesterday = date.today() - timedelta(days=1)
+    days = vn_calendar.open_days(yesterday - timedelta(days=30), yesterday)
+    return days[-1].isoformat() if days else yesterday.isoformat()
+
+def _advance(state, fromdate):
+    """Cộng thêm các phiên đã đóng chưa tính vào thống kê"""
+    symbols = state['symbols'].tolist()
+    todate = _last_session()
+    if not symbols or (state['through'] is not None and state['through'] >= todate):
+        return state
+    start = fromdate if state['through'] is None else \
+        (date.fromisoformat(state['through']) + timedelta(days=1)).isoformat()
+    closes = _closes(symbols, start, todate)
+    if not len(closes):
+        return state
+    last_close = None if state['through'] is None else state['last_close']
+    updated = _accumulate(state, log_returns(closes, last_close).to_numpy())
+    updated['last_close'] = closes.iloc[-1].to_numpy(dtype='f8')
+    updated['through'] = closes.index[-1].strftime('%Y-%m-%d')
+    return updated
+
+def build(fromdate=None):
+    """Dựng / cập nhật thống kê của toàn bộ mã niêm yết (dùng trong lệnh build_correlation): thêm mã mới
+    niêm yết, bỏ mã đã hủy niêm yết, cộng các phiên mới. Các mã ngoài danh sách (CUSTOM) cũng được cộng
+    các phiên mới ở đây; request chỉ đọc thống kê."""
+    fromdate = fromdate or PRICE_HISTORY_START
+    key = (ALL, fromdate)
+    with _lock(key):
+        state = _load_state(key) or _empty_state([])
+        updated = _advance(_reshape(state, universe(), fromdate), fromdate)
+        if updated is not state:
+            _save_state(key, updated)
+
+    custom_key = (CUSTOM, fromdate)
+    with _lock(custom_key):
+        custom = _load_state(custom_key)
+        if custom is not None:
+            advanced = _advance(custom, fromdate)
+            if advanced is not custom:
+                _save_state(custom_key, advanced)
+    return updated
+
+def _custom(symbols, fromdate):
+    """Thống kê chứa `symbols` (các mã không có trong ALL). Chỉ thêm hàng / cột cho mã chưa có;
+    giữ tối đa CORRELATION_CUSTOM_MAX_SYMBOLS mã, bỏ các mã lâu không được hỏi nhất."""
+    if len(symbols) > CORRELATION_CUSTOM_MAX_SYMBOLS:
+        raise ValueError(f"At most {CORRELATION_CUSTOM_MAX_SYMBOLS} symbols outside the listed universe "
+                         f"can be compared at once.")
+    key = (CUSTOM, fromdate)
+    with _lock(key):
+        state = _load_state(key) or _empty_state([])
+        current = state['symbols'].tolist()
+        used = dict(zip(current, state['used']))
+        used.update(dict.fromkeys(symbols, time.time()))
+
+        target = set(current) | set(symbols)
+        stale = sorted(target - set(symbols), key=used.get)
+        target -= set(stale[:max(0, len(target) - CORRELATION_CUSTOM_MAX_SYMBOLS)])
+        target = sorted(target)
+
+        updated = _reshape(state, target, fromdate)
+        if updated['through'] is None:
+            updated = _advance(updated, fromdate)
+        updated = dict(updated, used=np.array([used[symbol] for symbol in target]))
+        if updated['symbols'].tolist() != current:
+            _save_state(key, updated)
+        else:
+            # Chỉ đổi thời điểm dùng: giữ trong bộ nhớ, lưu cùng lần thêm mã sau
+            _states[key] = (_states[key][0], updated)
+        return updated
+
+def universe(industry=None):
+    """Các mã niêm yết lấy từ industries_company(), lọc theo ngành ICB nếu có"""
+    if industry:
+        return sorted(finance_df.industry_symbols(industry))
+    return sorted(finance_df.industries_company()['symbol'].dropna().unique())
+
+def return_matrix(symbols, fromdate, todate):
+    """Ma trận lợi suất log (ngày x mã) của `symbols` trong [fromdate, todate]"""
+    symbols = sorted({symbol.strip().upper() for symbol in symbols if symbol.strip()})
+    return log_returns(_closes(symbols, fromdate, todate))
+
+def correlation_matrix(symbols=None, fromdate=None, kind='corr', min_periods=20, industry=None):
+    """Ma trận tương quan (kind='corr') hoặc hiệp phương sai (kind='cov') của lợi suất log theo ngày.
+
+    Mặc định dùng toàn bộ các mã niêm yết. Mỗi cặp mã chỉ dùng các ngày cả hai đều có giá
+    (pairwise-complete, giống DataFrame.corr()), cặp có ít hơn `min_periods` ngày chung là NaN.
+    Thống kê được lưu trong CACHE_DIR/correlation và được cộng các phiên mới bằng lệnh build_correlation.
+    Toàn bộ mã / một ngành được cắt từ thống kê do lệnh build_correlation dựng sẵn (ValueError nếu chưa dựng);
+    danh sách mã có mã ngoài thống kê đó dùng thống kê CUSTOM, chỉ tải giá của các mã chưa có.
+    """
+    if kind not in ('corr', 'cov'):
+        raise ValueError("Invalid kind parameter.")
+    fromdate = fromdate or PRICE_HISTORY_START
+    whole = symbols is None
+    if whole:
+        symbols = universe(industry)
+    symbols = sorted({symbol.strip().upper() for symbol in symbols if symbol.strip()})
+    if not symbols:
+        raise ValueError("No symbols to compare.")
+
+    state = _load_state((ALL, fromdate))
+    if state is None and whole:
+        raise ValueError(f"Correlation statistics from {fromdate} have not been built yet "
+                         f"(run manage.py build_correlation --from-date {fromdate}).")
+    listed = set() if state is None else set(state['symbols'].tolist())
+    if whole:
+        # Mã mới niêm yết được thêm ở lần chạy build_correlation sau
+        symbols = [symbol for symbol in symbols if symbol in listed]
+        if not symbols:
+            raise ValueError("No symbols to compare.")
+    elif not listed.issuperset(symbols):
+        state = _custom(symbols, fromdate)
+
+    index = {symbol: i for i, symbol in enumerate(state['symbols'].tolist())}
+    positions = np.array([index[symbol] for symbol in symbols])
+    n, sx, sxx, sxy = (state[name][np.ix_(positions, positions)] for name in STAT_NAMES)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # sx[i, j] là tổng của mã i, sx.T[i, j] là tổng của mã j trên cùng các ngày chung
+        covariance = (sxy - sx * sx.T / n) / (n - 1)
+        if kind == 'cov':
+            result = covariance
+        else:
+            variance = (sxx - sx * sx / n) / (n - 1)
+            result = covariance / np.sqrt(variance * variance.T)
+            result = np.clip(result, -1.0, 1.0)
+    result = np.where(n >= max(min_periods, 2), result, np.nan)
+    return pd.DataFrame(result, index=symbols, columns=symbols)
@@ -0,0 +1,80 @@
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from stock_app.static.finance_py.storage import connect
+
+DB_NAME = 'exchange_rate.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exchange_rates (
+    date TEXT NOT NULL,
+    currency_code TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    currency_name TEXT,
+    cash REAL,
+    transfer REAL,
+    sell REAL,
+    PRIMARY KEY (date, currency_code)
+);
+-- Mỗi ngày đã hỏi API được ghi lại, kể cả ngày không có dữ liệu (row_count = 0)
+CREATE TABLE IF NOT EXISTS exchange_rate_days (
+    date TEXT PRIMARY KEY,
+    row_count INTEGER NOT NULL
+);
+"""
+
+
+def _connect():
+    return connect(DB_NAME, SCHEMA)
+
+def missing_dates(dates):
+    """Trả về các ngày (YYYY-MM-DD) trong `dates` chưa có trong kho, giữ nguyên thứ tự"""
+    if not dates:
+        return []
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            'SELECT date FROM exchange_rate_days WHERE date BETWEEN ? AND ?',
+            (min(dates), max(dates)),
+        ).fetchall()
+    known = {row[0] for row in rows}
+    return [date_str for date_str in dates if date_str not in known]
+
+def save_days(days):
+    """Lưu kết quả API {ngày: danh sách tỷ giá}.
+
+    Chỉ lưu các ngày đã qua và đã được API xác nhận (danh sách khác None),
+    vì tỷ giá của ngày hôm nay vẫn có thể thay đổi.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    days = {date_str: rows for date_str, rows in days.items() if date_str < today and rows is not None}
+    if not days:
+        return
+
+    def to_number(value):
+        value = pd.to_numeric(value, errors='coerce')
+        return None if pd.isna(value) else float(value)
+
+    rate_rows = [
+        (date_str, item.get('currencyCode'), seq, item.get('currencyName'),
+         to_number(item.get('cash')), to_number(item.get('transfer')), to_number(item.get('sell')))
+        for date_str, rows in days.items()
+        for seq, item in enumerate(rows)
+    ]
+    with closing(_connect()) as conn, conn:
+        conn.executemany('INSERT OR REPLACE INTO exchange_rates VALUES (?, ?, ?, ?, ?, ?, ?)', rate_rows)
+        conn.executemany(
+            'INSERT OR REPLACE INTO exchange_rate_days VALUES (?, ?)',
+            [(date_str, len(rows)) for date_str, rows in days.items()],
+        )
+
+def load(fromdate, todate):
+    """Đọc tỷ giá đã lưu trong khoảng [fromdate, todate] với tên cột giống API"""
+    with closing(_connect()) as conn:
+        return pd.read_sql_query(
+            'SELECT date AS Date, currency_name AS currencyName, currency_code AS currencyCode, '
+            'cash, transfer, sell FROM exchange_rates '
+            'WHERE date BETWEEN ? AND ? ORDER BY date, seq',
+            conn, params=(fromdate, todate),
+        )
@@ -0,0 +1,172 @@
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from stock_app.static.finance_py.storage import connect
+
+DB_NAME = 'gold_sjc.sqlite3'
+
+# Giá mỗi (chi nhánh, loại vàng) được lưu theo từng đoạn không đổi: một dòng cho
+# cả đoạn các ngày có dữ liệu liên tiếp từ start_date đến end_date có cùng giá.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS gold_runs (
+    branch TEXT NOT NULL,
+    type_name TEXT NOT NULL,
+    item_id INTEGER,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    buy REAL,
+    sell REAL,
+    PRIMARY KEY (branch, type_name, start_date)
+);
+CREATE INDEX IF NOT EXISTS gold_runs_end ON gold_runs (end_date);
+-- Mỗi ngày đã hỏi API được ghi lại, kể cả ngày không có dữ liệu (row_count = 0)
+CREATE TABLE IF NOT EXISTS gold_days (
+    date TEXT PRIMARY KEY,
+    row_count INTEGER NOT NULL
+);
+"""
+
+RUN_COLUMNS = ['branch', 'type_name', 'item_id', 'start_date', 'end_date', 'buy', 'sell']
+
+
+def _connect():
+    return connect(DB_NAME, SCHEMA)
+
+def _data_days(conn, fromdate=None, todate=None):
+    """Các ngày đã lưu có dữ liệu (YYYY-MM-DD), sắp xếp tăng dần"""
+    query = 'SELECT date FROM gold_days WHERE row_count > 0'
+    params = []
+    if fromdate:
+        query += ' AND date >= ?'
+        params.append(fromdate)
+    if todate:
+        query += ' AND date <= ?'
+        params.append(todate)
+    rows = conn.execute(query + ' ORDER BY date', params).fetchall()
+    return np.array([row[0] for row in rows], dtype=object)
+
+def _expand(runs, days):
+    """Bung các đoạn giá thành chuỗi theo ngày trên danh sách ngày có dữ liệu `days`"""
+    if runs.empty or len(days) == 0:
+        return pd.DataFrame(columns=['branch', 'type_name', 'item_id', 'date', 'buy', 'sell'])
+
+    first = np.searchsorted(days, runs['start_date'].to_numpy(dtype=object), side='left')
+    last = np.searchsorted(days, runs['end_date'].to_numpy(dtype=object), side='right')
+    counts = np.maximum(last - first, 0)
+
+    # Vị trí ngày của từng dòng: first của đoạn + thứ tự trong đoạn
+    run_index = np.repeat(np.arange(len(runs)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    expanded = runs.iloc[run_index][['branch', 'type_name', 'item_id', 'buy', 'sell']].reset_index(drop=True)
+    expanded.insert(3, 'date', days[first[run_index] + offsets])
+    return expanded
+
+def _compress(daily, days):
+    """Gộp chuỗi theo ngày thành các đoạn giá không đổi trên các ngày liên tiếp của `days`"""
+    if daily.empty:
+        return pd.DataFrame(columns=RUN_COLUMNS)
+
+    daily = daily.copy()
+    daily['pos'] = np.searchsorted(days, daily['date'].to_numpy(dtype=object))
+    daily = daily.sort_values(['branch', 'type_name', 'pos'], ignore_index=True)
+
+    same_series = (daily['branch'].eq(daily['branch'].shift())
+                   & daily['type_name'].eq(daily['type_name'].shift()))
+    same_price = (daily['buy'].eq(daily['buy'].shift()) | (daily['buy'].isna() & daily['buy'].shift().isna())) \
+        & (daily['sell'].eq(daily['sell'].shift()) | (daily['sell'].isna() & daily['sell'].shift().isna()))
+    next_day = daily['pos'].eq(daily['pos'].shift() + 1)
+    run_id = (~(same_series & same_price & next_day)).cumsum()
+
+    runs = daily.groupby(run_id, sort=False).agg(
+        branch=('branch', 'first'),
+        type_name=('type_name', 'first'),
+        item_id=('item_id', 'first'),
+        start_date=('date', 'first'),
+        end_date=('date', 'last'),
+        buy=('buy', 'first'),
+        sell=('sell', 'first'),
+    )
+    return runs[RUN_COLUMNS].reset_index(drop=True)
+
+def missing_dates(dates):
+    """Trả về các ngày (YYYY-MM-DD) trong `dates` chưa có trong kho, giữ nguyên thứ tự"""
+    if not dates:
+        return []
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            'SELECT date FROM gold_days WHERE date BETWEEN ? AND ?', (min(dates), max(dates))
+        ).fetchall()
+    known = {row[0] for row in rows}
+    return [date_str for date_str in dates if date_str not in known]
+
+def save_days(days):
+    """Lưu kết quả API {ngày YYYY-MM-DD: [(Id, TypeName, BranchName, BuyValue, SellValue, ...)]}.
+
+    Chỉ lưu các ngày đã qua và đã được API xác nhận (danh sách khác None).
+    Các đoạn giá xung quanh những ngày mới được tính lại để vẫn chỉ lưu các lần đổi giá.
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    days = {date_str: rows for date_str, rows in days.items() if date_str < today and rows is not None}
+    if not days:
+        return
+
+    new_rows = pd.DataFrame(
+        [(row[2], row[1], row[0], date_str, row[3], row[4]) for date_str, rows in days.items() for row in rows],
+        columns=['branch', 'type_name', 'item_id', 'date', 'buy', 'sell'],
+    )
+
+    with closing(_connect()) as conn, conn:
+        old_days = _data_days(conn)
+        conn.executemany(
+            'INSERT OR REPLACE INTO gold_days VALUES (?, ?)',
+            [(date_str, len(rows)) for date_str, rows in days.items()],
+        )
+        if new_rows.empty:
+            return
+        all_days = _data_days(conn)
+
+        # Khoảng bị ảnh hưởng: từ ngày có dữ liệu liền trước đến ngày liền sau các ngày mới
+        low, high = new_rows['date'].min(), new_rows['date'].max()
+        low_pos = np.searchsorted(old_days, low, side='left')
+        high_pos = np.searchsorted(old_days, high, side='right')
+        window_low = old_days[low_pos - 1] if low_pos > 0 else low
+        window_high = old_days[high_pos] if high_pos < len(old_days) else high
+
+        runs = pd.read_sql_query(
+            'SELECT rowid, * FROM gold_runs WHERE start_date <= ? AND end_date >= ?',
+            conn, params=(window_high, window_low),
+        )
+        expanded = _expand(runs, old_days)
+        daily = pd.concat([expanded, new_rows], ignore_index=True) if not expanded.empty else new_rows
+        daily = daily.drop_duplicates(['branch', 'type_name', 'date'], keep='last')
+        merged = _compress(daily, all_days)
+
+        conn.executemany('DELETE FROM gold_runs WHERE rowid = ?', [(int(rowid),) for rowid in runs['rowid']])
+        conn.executemany(
+            'INSERT OR REPLACE INTO gold_runs VALUES (?, ?, ?, ?, ?, ?, ?)',
+            merged.astype(object).where(merged.notna(), None).itertuples(index=False, name=None),
+        )
+
+def load(fromdate, todate, branches=None, types=None):
+    """Chuỗi giá theo ngày trong [fromdate, todate], lọc chi nhánh / loại vàng trước khi bung.
+
+    Trả về các cột branch, type_name, item_id, date, buy, sell sắp xếp theo ngày và Id.
+    """
+    query = 'SELECT * FROM gold_runs WHERE start_date <= ? AND end_date >= ?'
+    params = [todate, fromdate]
+    if branches:
+        query += f' AND branch IN ({",".join("?" * len(branches))})'
+        params.extend(branches)
+    if types:
+        query += f' AND type_name IN ({",".join("?" * len(types))})'
+        params.extend(types)
+
+    with closing(_connect()) as conn:
+        runs = pd.read_sql_query(query, conn, params=params)
+        days = _data_days(conn, fromdate, todate)
+
+    daily = _expand(runs, days)
+    return daily.sort_values(['date', 'item_id'], ignore_index=True)
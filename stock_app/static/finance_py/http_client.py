@@ -0,0 +1,49 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from stock_app.static.finance_py.const import HTTP_POOLS
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter gán timeout mặc định cho mọi request không tự truyền timeout"""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def _create_session(name):
+    config = HTTP_POOLS[name]
+    adapter = TimeoutHTTPAdapter(
+        timeout=config['timeout'],
+        pool_connections=4,  # Một nguồn có thể dùng vài host con (vd. api. và mt.vietcap)
+        pool_maxsize=config['pool_size'],
+        max_retries=Retry(total=2, connect=2, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def get_session(name):
+    """Session keep-alive dùng chung trong process cho nguồn `name` (khai báo trong HTTP_POOLS)"""
+    if name not in HTTP_POOLS:
+        raise ValueError(f"Unknown HTTP pool: {name}")
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = _create_session(name)
+    return session
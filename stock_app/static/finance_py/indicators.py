@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+# Các chỉ báo hỗ trợ và tham số mặc định (chu kỳ)
+INDICATORS = {
+    'sma': 20,
+    'ema': 20,
+    'rsi': 14,
+    'macd': (12, 26, 9),
+    'bbands': 20,
+    'atr': 14,
+    'volatility': 20,
+}
+
+BOLLINGER_WIDTH = 2  # Số lần độ lệch chuẩn của dải Bollinger
+TRADING_DAYS = 252  # Số phiên một năm, dùng để năm hóa độ biến động
+
+
+def parse_indicators(specs):
+    """Đọc danh sách chỉ báo dạng 'sma', 'sma:50' hoặc 'macd:12:26:9' thành [(tên, tham số)]"""
+    parsed = []
+    for spec in specs:
+        name, *params = str(spec).strip().lower().split(':')
+        if not name:
+            continue
+        if name not in INDICATORS:
+            raise ValueError(f"Invalid indicator: {name}")
+        default = INDICATORS[name]
+        try:
+            if isinstance(default, tuple):
+                params = tuple(int(value) for value in params) + default[len(params):]
+                if len(params) != len(default):
+                    raise ValueError
+            else:
+                params = int(params[0]) if params else default
+        except ValueError:
+            raise ValueError(f"Invalid indicator parameters: {spec}")
+        if min(np.atleast_1d(params)) < 1:
+            raise ValueError(f"Invalid indicator parameters: {spec}")
+        parsed.append((name, params))
+    return parsed
+
+
+class _Series:
+    """Các mảng liên tục của một hoặc nhiều mã (đã sắp theo mã, ngày) và các giá trị trung gian dùng chung"""
+
+    def __init__(self, bars, group_ids):
+        self.close = bars['close'].to_numpy(dtype='f8')
+        self.high = bars['high'].to_numpy(dtype='f8')
+        self.low = bars['low'].to_numpy(dtype='f8')
+
+        # Vị trí bắt đầu của từng mã và thứ tự của mỗi dòng trong mã đó
+        n = len(self.close)
+        new_group = np.ones(n, dtype=bool)
+        new_group[1:] = group_ids[1:] != group_ids[:-1]
+        self.starts = np.flatnonzero(new_group)
+        self.bounds = np.append(self.starts, n)
+        self.position = np.arange(n) - np.repeat(self.starts, np.diff(self.bounds))
+        self.new_group = new_group
+        self._cache = {}
+
+    def cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def previous_close(self):
+        def compute():
+            previous = np.roll(self.close, 1)
+            previous[self.new_group] = np.nan
+            return previous
+        return self.cached('previous_close', compute)
+
+    def log_returns(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.cached('log_returns', lambda: np.log(self.close / self.previous_close()))
+
+    def rolling_sum(self, name, values, window):
+        """Tổng trượt trong từng mã bằng tổng tích lũy; NaN nếu cửa sổ thiếu dữ liệu"""
+        def compute():
+            valid = np.isfinite(values)
+            sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+            counts = np.concatenate([[0], np.cumsum(valid)])
+            end = np.arange(1, len(values) + 1)
+            start = np.maximum(end - window, 0)
+            total = sums[end] - sums[start]
+            full = (self.position >= window - 1) & (counts[end] - counts[start] == window)
+            return np.where(full, total, np.nan)
+        return self.cached(('sum', name, window), compute)
+
+    def rolling_mean(self, name, values, window):
+        return self.cached(('mean', name, window), lambda: self.rolling_sum(name, values, window) / window)
+
+    def rolling_std(self, name, values, window, ddof=0):
+        def compute():
+            mean = self.rolling_mean(name, values, window)
+            mean_square = self.rolling_sum(name + '^2', values * values, window) / window
+            variance = np.maximum(mean_square - mean * mean, 0.0) * window / (window - ddof)
+            return np.sqrt(variance)
+        if window <= ddof:
+            return np.full(len(values), np.nan)
+        return self.cached(('std', name, window, ddof), compute)
+
+    def ewm(self, name, values, alpha, min_periods):
+        """Trung bình trượt hàm mũ (adjust=False, xử lý NaN giống pandas) tính riêng trên từng mã.
+
+        Mỗi phiên là một phép biến đổi y = c * y_trước + e (c = 0 ở quan sát đầu tiên của mỗi mã);
+        các phép biến đổi được ghép bằng phép quét song song, log2(số phiên dài nhất) lượt trên cả mảng.
+        """
+        def compute():
+            valid = np.isfinite(values)
+            observed = np.cumsum(valid)
+            # Số quan sát từ đầu mã đến phiên hiện tại
+            count = observed - np.repeat(observed[self.starts] - valid[self.starts], np.diff(self.bounds))
+
+            # Sau g phiên NaN, trọng số cũ còn (1 - alpha)^(g + 1) và được chuẩn hóa lại như pandas
+            index = np.flatnonzero(valid)
+            first = count[index] == 1
+            weight = (1 - alpha) ** np.diff(index, prepend=0)
+            scale = weight + alpha
+            c = np.where(count > 0, 1.0, 0.0)  # phiên NaN giữ nguyên giá trị trước, NaN đầu mã thì bỏ
+            e = np.zeros(len(values))
+            c[index] = np.where(first, 0.0, weight / scale)
+            e[index] = np.where(first, values[index], alpha * values[index] / scale)
+
+            shift, longest = 1, np.diff(self.bounds).max()
+            buffer = np.empty(len(values))
+            while shift < longest and c.any():
+                np.multiply(c[shift:], e[:-shift], out=buffer[shift:])
+                e[shift:] += buffer[shift:]
+                np.multiply(c[shift:], c[:-shift], out=buffer[shift:])
+                c[shift:] = buffer[shift:]
+                shift *= 2
+            return np.where(count >= max(min_periods, 1), e, np.nan)
+        return self.cached(('ewm', name, alpha, min_periods), compute)
+
+    def ema(self, span):
+        return self.ewm('close', self.close, 2 / (span + 1), span)
+
+    def true_range(self):
+        def compute():
+            # Phiên đầu của mỗi mã chưa có giá đóng cửa trước, fmax bỏ qua NaN
+            previous = self.previous_close()
+            return np.fmax(self.high - self.low, np.fmax(np.abs(self.high - previous), np.abs(self.low - previous)))
+        return self.cached('true_range', compute)
+
+
+def _sma(series, window):
+    return {f'sma_{window}': series.rolling_mean('close', series.close, window)}
+
+def _ema(series, span):
+    return {f'ema_{span}': series.ema(span)}
+
+def _rsi(series, window):
+    change = series.close - series.previous_close()
+    gain = np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
+    loss = np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+    # Làm trơn kiểu Wilder: alpha = 1 / chu kỳ
+    average_gain = series.ewm('gain', gain, 1 / window, window)
+    average_loss = series.ewm('loss', loss, 1 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + average_gain / average_loss)
+    rsi = np.where((average_loss == 0) & np.isfinite(average_gain), 100.0, rsi)
+    return {f'rsi_{window}': rsi}
+
+def _macd(series, params):
+    fast, slow, signal = params
+    macd = series.ema(fast) - series.ema(slow)
+    signal_line = series.ewm(f'macd_{fast}_{slow}', macd, 2 / (signal + 1), signal)
+    suffix = f'{fast}_{slow}_{signal}'
+    return {f'macd_{suffix}': macd, f'macd_signal_{suffix}': signal_line, f'macd_hist_{suffix}': macd - signal_line}
+
+def _bbands(series, window):
+    middle = series.rolling_mean('close', series.close, window)
+    width = BOLLINGER_WIDTH * series.rolling_std('close', series.close, window)
+    return {f'bb_middle_{window}': middle, f'bb_upper_{window}': middle + width, f'bb_lower_{window}': middle - width}
+
+def _atr(series, window):
+    return {f'atr_{window}': series.ewm('true_range', series.true_range(), 1 / window, window)}
+
+def _volatility(series, window):
+    # Độ lệch chuẩn mẫu của lợi suất log, năm hóa theo số phiên giao dịch
+    deviation = series.rolling_std('log_returns', series.log_returns(), window, ddof=1)
+    return {f'volatility_{window}': deviation * np.sqrt(TRADING_DAYS)}
+
+_COMPUTE = {
+    'sma': _sma,
+    'ema': _ema,
+    'rsi': _rsi,
+    'macd': _macd,
+    'bbands': _bbands,
+    'atr': _atr,
+    'volatility': _volatility,
+}
+
+
+def add_indicators(df, indicators):
+    """Thêm các cột chỉ báo kỹ thuật vào kết quả price_stock() / price_panel() (dạng long).
+
+    `indicators` là danh sách dạng 'sma', 'sma:50', 'macd:12:26:9'. Tất cả các mã được
+    tính trong một lượt trên mảng liên tục, các giá trị trung gian (lợi suất, tổng trượt,
+    EMA) chỉ tính một lần. Thứ tự dòng và index của `df` được giữ nguyên.
+    """
+    indicators = parse_indicators(indicators)
+    if not indicators or df.empty:
+        return df
+
+    is_panel = isinstance(df.index, pd.MultiIndex)
+    bars = df.reset_index() if is_panel else df
+    if is_panel:
+        group_ids = pd.factorize(bars['symbol'])[0]
+    else:
+        group_ids = np.zeros(len(bars), dtype=int)
+    dates = pd.to_datetime(bars['date']).to_numpy()
+    order = np.lexsort((dates, group_ids))
+
+    series = _Series(bars.iloc[order], group_ids[order])
+    columns = {}
+    for name, params in indicators:
+        columns.update(_COMPUTE[name](series, params))
+
+    result = df.copy()
+    for column, values in columns.items():
+        # Trả các giá trị về đúng vị trí dòng ban đầu
+        restored = np.empty(len(values))
+        restored[order] = values
+        result[column] = restored
+    return result
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from stock_app.static.finance_py.const import STATEMENT_LAYOUT_TTL
+from stock_app.static.finance_py.storage import connect
+
+DB_NAME = 'statement_layouts.sqlite3'
+
+# Mẫu dòng của báo cáo tài chính (itemCode theo thứ tự hiển thị và tên đã thêm tiền tố, đổi tên),
+# lưu theo khóa (ngân hàng / thường, loại báo cáo, modelType)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statement_layouts (
+    layout_key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    item_codes TEXT NOT NULL,
+    names TEXT NOT NULL
+);
+"""
+
+_layouts = {}  # layout_key -> (fetched_at, DataFrame)
+_locks = {}
+_guard = threading.Lock()
+
+
+def _connect():
+    return connect(DB_NAME, SCHEMA)
+
+def model_name(model_type):
+    """modelType dạng chuỗi ổn định: 1, 1.0 và '1' đều thành '1'"""
+    try:
+        number = float(model_type)
+    except (TypeError, ValueError):
+        return str(model_type)
+    return str(int(number)) if number.is_integer() else str(model_type)
+
+def layout_key(bank, types, model_type):
+    return f"{'bank' if bank else 'normal'}|{types}|{model_name(model_type)}"
+
+def parse_key(key):
+    """Ngược với layout_key(): (bank, types, model_type dạng chuỗi)"""
+    kind, types, model_type = key.split('|', 2)
+    return kind == 'bank', types, model_type
+
+def lock(key):
+    """Khóa theo mẫu, để nhiều mã cùng mẫu tải đồng thời chỉ gọi financial_models một lần"""
+    with _guard:
+        return _locks.setdefault(key, threading.Lock())
+
+def get(key, ttl=STATEMENT_LAYOUT_TTL):
+    """Mẫu dòng (DataFrame itemCode, Name) còn hạn của `key`, hoặc None"""
+    now = time.time()
+    with _guard:
+        cached = _layouts.get(key)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            'SELECT fetched_at, item_codes, names FROM statement_layouts WHERE layout_key = ?', (key,)
+        ).fetchone()
+    if row is None or now - row[0] >= ttl:
+        return None
+
+    layout = pd.DataFrame({'itemCode': json.loads(row[1]), 'Name': json.loads(row[2])})
+    with _guard:
+        _layouts[key] = (row[0], layout)
+    return layout
+
+def save(key, layout):
+    """Lưu mẫu dòng vào bộ nhớ và vào kho trên đĩa"""
+    fetched_at = time.time()
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO statement_layouts VALUES (?, ?, ?, ?)',
+            (key, fetched_at, json.dumps(layout['itemCode'].tolist()),
+             json.dumps(layout['Name'].tolist(), ensure_ascii=False)),
+        )
+    with _guard:
+        _layouts[key] = (fetched_at, layout)
+
+def all_layouts():
+    """Tất cả các mẫu dòng đã lưu trên đĩa (kể cả đã quá hạn): {layout_key: DataFrame itemCode, Name}"""
+    with closing(_connect()) as conn:
+        rows = conn.execute('SELECT layout_key, item_codes, names FROM statement_layouts').fetchall()
+    return {
+        key: pd.DataFrame({'itemCode': json.loads(item_codes), 'Name': json.loads(names)})
+        for key, item_codes, names in rows
+    }
@@ -0,0 +1,268 @@
+import json
+import os
+import re
+import threading
+import time
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+import pandas as pd
+
+from stock_app.static.finance_py import http_client
+from stock_app.static.finance_py.const import LISTING_TTL, get_headers
+from stock_app.static.finance_py.schemas import apply_schema
+from stock_app.static.finance_py.storage import cache_path
+
+SNAPSHOT_NAME = 'listing_universe.json'
+
+COLUMNS = ['symbol', 'board', 'organName', 'icbName2', 'icbName3', 'icbName4']
+
+# Các cột dùng để nhóm mã
+GROUPS = ('board', 'icbName2', 'icbName3', 'icbName4')
+
+# Từ trong tên ngắn hơn độ dài này chỉ được so khớp đầu từ, không so khớp gần đúng
+FUZZY_MIN_LENGTH = 4
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Chữ thường, bỏ dấu tiếng Việt: 'Đầu tư' -> 'dau tu'"""
+    text = unicodedata.normalize('NFD', str(text).replace('đ', 'd').replace('Đ', 'D'))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+def _tokens(text):
+    return _TOKEN.findall(fold(text))
+
+def _deletes(word):
+    # Các biến thể bỏ một ký tự: hai từ có biến thể chung thì cách nhau tối đa một lỗi gõ
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def fetch_companies():
+    """Tải danh sách mã niêm yết (tên, sàn, ngành ICB cấp 2-4) từ vietcap"""
+    url_1 = 'https://api.vietcap.com.vn/data-mt/graphql'
+    payload = "{\"query\":\"{ CompaniesListingInfo { ticker organName icbName2 icbName3 icbName4 } }\",\"variables\":{}}"
+
+    session = http_client.get_session('vietcap')
+    response_1 = session.post(url_1, headers=get_headers(), data=payload)
+    json_data = response_1.json()
+    df = pd.DataFrame(json_data['data']['CompaniesListingInfo'])
+    data_1 = df.rename(columns={'ticker': 'symbol'})
+
+    url_2 = 'https://mt.vietcap.com.vn/api/price/symbols/getAll'
+    response_2 = session.post(url_2, headers=get_headers())
+    json_data = response_2.json()
+    data_2 = pd.DataFrame(json_data)
+
+    data = pd.merge(data_1, data_2[['symbol', 'board']], on='symbol', how='left')
+    data = data[COLUMNS]
+    return apply_schema(data, 'industries_company')
+
+
+class ListingIndex:
+    """Chỉ mục trong bộ nhớ của danh sách mã niêm yết: tra theo mã, tìm theo đầu mã / tên (bỏ dấu,
+    cho phép gõ sai một ký tự) và nhóm theo sàn, ngành ICB cấp 2-4."""
+
+    def __init__(self, companies, fetched_at=0.0):
+        self.companies = companies
+        self.fetched_at = fetched_at
+        # Bản ghi xếp theo mã, nên số thứ tự bản ghi cũng là thứ tự theo mã khi xếp kết quả
+        frame = companies.reindex(columns=COLUMNS).astype(object)
+        frame = frame.where(frame.notna(), None).sort_values('symbol', key=lambda column: column.astype(str))
+        self.records = frame.to_dict('records')
+
+        symbols = [str(record['symbol'] or '').upper() for record in self.records]
+        self._by_symbol = {symbol: i for i, symbol in enumerate(symbols)}
+        self._symbol_keys = [symbol.lower() for symbol in symbols]
+        self._symbol_ids = list(range(len(symbols)))
+
+        # Các từ trong tên (đã bỏ dấu) sắp xếp để tìm đầu từ bằng bisect
+        words = sorted((token, i) for i, record in enumerate(self.records)
+                       for token in set(_tokens(record['organName'] or '')))
+        self._word_keys = [token for token, i in words]
+        self._word_ids = [i for token, i in words]
+
+        self._symbol_deletes = {}
+        for symbol, i in self._by_symbol.items():
+            for variant in _deletes(symbol.lower()):
+                self._symbol_deletes.setdefault(variant, set()).add(i)
+        self._word_deletes = {}
+        for token, i in words:
+            if len(token) >= FUZZY_MIN_LENGTH:
+                for variant in _deletes(token):
+                    self._word_deletes.setdefault(variant, set()).add(i)
+
+        self.groups = {
+            column: {str(key): [symbols[i] for i in ids] for key, ids in self._group_ids(column).items()}
+            for column in GROUPS
+        }
+        self._industries = {}
+        for column in GROUPS[1:]:
+            for key, members in self.groups[column].items():
+                self._industries.setdefault(key.strip().lower(), []).extend(members)
+
+    def _group_ids(self, column):
+        groups = {}
+        for i, record in enumerate(self.records):
+            if record[column] is not None:
+                groups.setdefault(record[column], []).append(i)
+        return groups
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, symbol):
+        """Thông tin một mã, None nếu không có"""
+        i = self._by_symbol.get(str(symbol).strip().upper())
+        return None if i is None else self.records[i]
+
+    def group(self, column, key):
+        """Các mã thuộc sàn / ngành `key` (column là 'board', 'icbName2', 'icbName3' hoặc 'icbName4')"""
+        if column not in self.groups:
+            raise ValueError("Invalid group parameter.")
+        return list(self.groups[column].get(key, []))
+
+    def industry(self, industry):
+        """Các mã thuộc ngành ICB `industry` ở bất kỳ cấp nào (không phân biệt hoa thường)"""
+        return list(dict.fromkeys(self._industries.get(industry.strip().lower(), [])))
+
+    @staticmethod
+    def _prefix(keys, ids, prefix):
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\uffff', start)
+        return ids[start:end]
+
+    def _name_prefix(self, tokens):
+        # Giao các tập mã theo từng từ, bắt đầu từ tập nhỏ nhất
+        slices = sorted((self._prefix(self._word_keys, self._word_ids, token) for token in tokens), key=len)
+        matched = set(slices[0])
+        for ids in slices[1:]:
+            matched.intersection_update(ids)
+        return matched
+
+    def _name_fuzzy(self, tokens):
+        matched = None
+        for token in tokens:
+            ids = set(self._prefix(self._word_keys, self._word_ids, token))
+            if len(token) >= FUZZY_MIN_LENGTH:
+                for variant in _deletes(token):
+                    ids |= self._word_deletes.get(variant, set())
+            matched = ids if matched is None else matched & ids
+        return matched or set()
+
+    def search(self, query, limit=10, board=None, industry=None):
+        """Tìm mã theo mã hoặc tên công ty, trả về tối đa `limit` bản ghi xếp theo mức độ khớp.
+
+        board / industry: chỉ lấy các mã thuộc sàn / ngành ICB tương ứng.
+        """
+        text = fold(query).strip()
+        tokens = _tokens(text)
+        if not tokens or limit <= 0:
+            return []
+        allowed = None
+        if board:
+            allowed = {self._by_symbol[symbol] for symbol in self.groups['board'].get(board, [])}
+        if industry:
+            ids = {self._by_symbol[symbol] for symbol in self.industry(industry)}
+            allowed = ids if allowed is None else allowed & ids
+
+        # Các mức khớp theo thứ tự ưu tiên: nguyên mã, đầu mã, đầu các từ trong tên, gần đúng mã, gần đúng tên
+        compact = ''.join(tokens)
+        stages = [
+            lambda: [self._by_symbol[compact.upper()]] if compact.upper() in self._by_symbol else [],
+            lambda: self._prefix(self._symbol_keys, self._symbol_ids, compact),
+            lambda: self._name_prefix(tokens),
+            lambda: set().union(*(self._symbol_deletes.get(variant, ()) for variant in _deletes(compact)))
+            if len(compact) >= 2 else [],
+            lambda: self._name_fuzzy(tokens),
+        ]
+        # Dừng sớm khi đã đủ kết quả ở các mức khớp cao hơn; trong cùng mức, mã xếp theo thứ tự chữ cái
+        found = []
+        seen = set()
+        for stage in stages:
+            ids = set(stage()) - seen
+            if allowed is not None:
+                ids &= allowed
+            ids = heapq.nsmallest(limit - len(found), ids)
+            found.extend(ids)
+            seen.update(ids)
+            if len(found) >= limit:
+                break
+        return [self.records[i] for i in found]
+
+
+_index = None
+_load_lock = threading.Lock()
+_refreshing = threading.Lock()  # Giữ trong lúc đang tải lại, để chỉ một luồng gọi vietcap
+
+def _read_snapshot():
+    path = cache_path(SNAPSHOT_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        snapshot = json.load(f)
+    companies = apply_schema(pd.DataFrame(snapshot['companies'], columns=COLUMNS), 'industries_company')
+    return ListingIndex(companies, snapshot['fetched_at'])
+
+def _write_snapshot(index):
+    # Ghi file tạm rồi đổi tên để process khác không đọc phải file đang ghi dở
+    path = cache_path(SNAPSHOT_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'fetched_at': index.fetched_at, 'companies': index.records}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _rebuild():
+    global _index
+    index = ListingIndex(fetch_companies(), time.time())
+    _write_snapshot(index)
+    _index = index
+    return index
+
+def refresh():
+    """Tải lại danh sách mã từ vietcap, dựng chỉ mục mới và lưu snapshot lên đĩa"""
+    with _refreshing:
+        return _rebuild()
+
+def _refresh_in_background():
+    # Đang có luồng làm mới thì thôi; các request tiếp tục dùng chỉ mục cũ
+    if not _refreshing.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            _rebuild()
+        except Exception as e:
+            print(f"Error refreshing listing universe: {e}")
+        finally:
+            _refreshing.release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+def get_index(wait=True):
+    """Chỉ mục hiện tại, không gọi vietcap trên luồng request nếu đã có chỉ mục (trong bộ nhớ hoặc snapshot).
+
+    Chỉ mục cũ hơn LISTING_TTL vẫn được dùng trong lúc làm mới ở nền. Khi chưa có gì: wait=True tải ngay,
+    wait=False trả về chỉ mục rỗng và tải ở nền.
+    """
+    global _index
+    index = _index
+    if index is None:
+        with _load_lock:
+            if _index is None:
+                _index = _read_snapshot()
+            index = _index
+    if index is None:
+        if wait:
+            with _load_lock:
+                return _index or refresh()
+        _refresh_in_background()
+        return ListingIndex(pd.DataFrame(columns=COLUMNS))
+    if time.time() - index.fetched_at >= LISTING_TTL:
+        _refresh_in_background()
+    return index
+
+def companies():
+    """Bảng danh sách mã niêm yết (symbol, board, organName, icbName2-4) từ chỉ mục"""
+    return get_index().companies.copy()
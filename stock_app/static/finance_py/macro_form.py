@@ -0,0 +1,127 @@
+from urllib.parse import urljoin
+
+import lxml.html
+import pandas as pd
+
+from stock_app.static.finance_py import macro_store
+from stock_app.static.finance_py.const import get_headers
+
+TABLE_ID = 'tbl-macro-data'
+
+# Tên các ô chọn trên form báo cáo vĩ mô của vietstock
+FIELD_TYPE = 'type'
+FIELD_FROM_YEAR = 'fromYear'
+FIELD_TO_YEAR = 'toYear'
+FIELD_FROM_MONTH = 'from'
+FIELD_TO_MONTH = 'to'
+
+_HEADER_ROW = "//tr[contains(concat(' ', normalize-space(@class), ' '), ' i-bg5 ')]"
+
+
+def _headers(referer=None):
+    # Bỏ Content-Type JSON mặc định: trang và form là HTML
+    headers = {key: value for key, value in get_headers().items() if key not in ('Content-Type', 'Accept')}
+    headers['Accept'] = 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+    if referer:
+        headers['Referer'] = referer
+    return headers
+
+def _document(content, encoding=None):
+    # Trang vietstock là UTF-8; bytes được giải mã theo charset của response
+    if isinstance(content, bytes):
+        return lxml.html.fromstring(content, parser=lxml.html.HTMLParser(encoding=encoding or 'utf-8'))
+    return lxml.html.fromstring(content)
+
+def _encoding(response):
+    # requests mặc định ISO-8859-1 cho text/html không khai báo charset; khi đó dùng UTF-8
+    return response.encoding if 'charset' in response.headers.get('Content-Type', '').lower() else None
+
+def _table_html(doc):
+    tables = doc.xpath(f"//table[@id='{TABLE_ID}']")
+    return lxml.html.tostring(tables[0]) if tables else None
+
+def _text(element):
+    return element.text_content().strip()
+
+def has_table(content, encoding=None):
+    """Trang có bảng tbl-macro-data với ít nhất một ô dữ liệu hay không"""
+    if not content:
+        return False
+    doc = _document(content, encoding)
+    return bool(doc.xpath(f"//table[@id='{TABLE_ID}']//td"))
+
+def parse_table(content, encoding=None):
+    """Bảng tbl-macro-data của trang thành DataFrame (tên cột lấy từ hàng tiêu đề i-bg5)"""
+    doc = _document(content, encoding)
+    table = doc.xpath(f"//table[@id='{TABLE_ID}']")[0]
+
+    header_rows = doc.xpath(_HEADER_ROW)
+    header = [_text(th) for th in header_rows[0].xpath('.//th')] if header_rows else []
+
+    data = []
+    for row in table.xpath('.//tr'):
+        cols = row.xpath('.//td')
+        if cols:
+            data.append([_text(col) for col in cols])
+    return pd.DataFrame(data, columns=header)
+
+def _form(doc):
+    # Form chứa ô chọn loại báo cáo
+    selects = doc.xpath(f"//select[@name='{FIELD_TYPE}']")
+    if not selects:
+        return None
+    forms = selects[0].xpath('ancestor::form')
+    return forms[-1] if forms else None
+
+def _choose(form, name, value, fields):
+    # Giống Select.select_by_value: giá trị phải là một option của ô chọn
+    selects = form.xpath(f".//select[@name='{name}']")
+    if not selects or str(value) not in [str(option) for option in selects[0].value_options]:
+        return False
+    fields[name] = str(value)
+    return True
+
+def fetch(session, url, report_type, from_year, to_year, from_month=None, to_month=None):
+    """Gửi lại form chọn kỳ của trang báo cáo vĩ mô bằng HTTP, không cần trình duyệt.
+
+    Trả về DataFrame, hoặc None nếu trang không có form, kết quả không có bảng dữ liệu hoặc các kỳ
+    trong bảng không khớp khoảng được yêu cầu (vd. form được điền bằng JS nên trang trả về bảng kỳ
+    mặc định); khi đó dùng Selenium.
+    """
+    response = session.get(url, headers=_headers())
+    response.raise_for_status()
+    doc = _document(response.content, _encoding(response))
+    form = _form(doc)
+    if form is None:
+        return None
+
+    # Các trường ẩn (vd. token chống giả mạo) giữ nguyên giá trị trang trả về
+    defaults = dict(form.form_values())
+    fields = dict(defaults)
+    choices = [(FIELD_TYPE, report_type), (FIELD_FROM_YEAR, from_year), (FIELD_TO_YEAR, to_year)]
+    if report_type == '2':
+        choices += [(FIELD_FROM_MONTH, from_month), (FIELD_TO_MONTH, to_month)]
+    for name, value in choices:
+        if value and not _choose(form, name, value, fields):
+            return None
+
+    action = urljoin(response.url, form.get('action') or response.url)
+    if (form.get('method') or 'get').lower() == 'post':
+        result = session.post(action, data=fields, headers=_headers(response.url))
+    else:
+        result = session.get(action, params=fields, headers=_headers(response.url))
+    result.raise_for_status()
+
+    result_doc = _document(result.content, _encoding(result))
+    if not result_doc.xpath(f"//table[@id='{TABLE_ID}']//td"):
+        return None
+    # Đã chọn kỳ khác mặc định mà bảng vẫn y như trang ban đầu: trang đã bỏ qua form
+    if fields != defaults and _table_html(result_doc) == _table_html(doc):
+        return None
+
+    df = parse_table(result.content, _encoding(result))
+    keys = macro_store.range_keys(report_type, from_year, to_year, from_month, to_month)
+    if not macro_store.matches(df, report_type, *keys):
+        print(f"Macro table over HTTP does not match the requested periods: {url}")
+        return None
+    return df
@@ -0,0 +1,225 @@
+import re
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+from stock_app.static.finance_py.const import MACRO_CACHE_TTL
+from stock_app.static.finance_py.storage import connect
+
+DB_NAME = 'macro_reports.sqlite3'
+
+# Bảng báo cáo vĩ mô dạng long: mỗi dòng là một chỉ tiêu trong một kỳ.
+# period_key = năm * 100 + tháng / quý (0 với báo cáo theo năm), dùng để cắt khoảng kỳ.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS macro_values (
+    url TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    period_key INTEGER NOT NULL,
+    period TEXT NOT NULL,
+    indicator TEXT NOT NULL,
+    indicator_seq INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (url, report_type, period_key, indicator)
+);
+-- Các khoảng kỳ đã tải từ vietstock; một yêu cầu nằm trong khoảng còn hạn được đọc từ kho
+CREATE TABLE IF NOT EXISTS macro_ranges (
+    url TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    from_key INTEGER NOT NULL,
+    to_key INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (url, report_type, from_key, to_key)
+);
+-- Hướng của bảng gốc: 'rows' (mỗi hàng một kỳ) hoặc 'columns' (mỗi cột một kỳ), và tên ô góc
+CREATE TABLE IF NOT EXISTS macro_tables (
+    url TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    orientation TEXT NOT NULL,
+    corner TEXT NOT NULL,
+    PRIMARY KEY (url, report_type)
+);
+"""
+
+_YEAR = re.compile(r'(?<!\d)(?:19|20)\d{2}(?!\d)')
+_SUB = re.compile(r'(?<!\d)\d{1,2}(?!\d)')
+# Một dấu phân cách và đúng 3 chữ số phía sau: có thể là phân nhóm hàng nghìn hoặc phần thập phân
+_AMBIGUOUS = re.compile(r'-?\d{1,3}[.,]\d{3}')
+
+_locks = {}
+_guard = threading.Lock()
+
+
+def _connect():
+    return connect(DB_NAME, SCHEMA)
+
+def lock(url, report_type):
+    """Khóa theo báo cáo, để nhiều request cùng lúc chỉ tải vietstock một lần"""
+    with _guard:
+        return _locks.setdefault((url, report_type), threading.Lock())
+
+def period_key(label):
+    """'T3/2024' -> 202403, 'Quý 2/2023' -> 202302, '2022' -> 202200; None nếu không phải tên kỳ"""
+    label = str(label)
+    year = _YEAR.search(label)
+    if year is None:
+        return None
+    sub = _SUB.search(label[:year.start()] + ' ' + label[year.end():])
+    return int(year.group()) * 100 + (int(sub.group()) if sub else 0)
+
+def range_keys(report_type, from_year, to_year, from_month=None, to_month=None):
+    """Khoảng period_key [from_key, to_key] của một yêu cầu"""
+    if report_type == '2':
+        return int(from_year) * 100 + int(from_month or 1), int(to_year) * 100 + int(to_month or 12)
+    return int(from_year) * 100, int(to_year) * 100 + 99
+
+def _clean(text):
+    return str(text).replace('%', '').replace('\xa0', '').replace(' ', '').strip()
+
+def decimal_mark(texts):
+    """Dấu thập phân (',' hoặc '.') của một bảng, đoán từ ô đầu tiên không mơ hồ.
+
+    '1.234,5', '3,25', '1.234.567' cho ','; '1,234.5', '3.5', '1,234,567' cho '.'. Nếu mọi ô đều mơ hồ
+    (vd. chỉ có '1,234') thì dùng ',' như bảng tiếng Việt.
+    """
+    for text in texts:
+        text = _clean(text)
+        if ',' in text and '.' in text:
+            return ',' if text.rfind(',') > text.rfind('.') else '.'
+        if text.count(',') > 1:
+            return '.'
+        if text.count('.') > 1:
+            return ','
+        if (',' in text or '.' in text) and not _AMBIGUOUS.fullmatch(text):
+            return ',' if ',' in text else '.'
+    return ','
+
+def to_number(text, decimal=None):
+    """Số liệu dạng chữ của vietstock ('1,234.5', '1.234,5', '3,2%', '-') thành số, NaN nếu không đọc được.
+
+    `decimal` là dấu thập phân của cả bảng (decimal_mark()); mặc định đoán từ chính ô này.
+    """
+    text = _clean(text)
+    decimal = decimal or decimal_mark([text])
+    if ',' in text and '.' in text:
+        decimal = ',' if text.rfind(',') > text.rfind('.') else '.'
+    grouping = '.' if decimal == ',' else ','
+    return pd.to_numeric(text.replace(grouping, '').replace(decimal, '.'), errors='coerce')
+
+def period_keys(df):
+    """(orientation, danh sách period_key) của bảng vietstock: kỳ nằm ở hàng tiêu đề ('columns')
+    hoặc ở cột đầu tiên ('rows'); None nếu không nhận ra"""
+    if df.empty or len(df.columns) < 2:
+        return None
+    header_keys = [period_key(column) for column in df.columns[1:]]
+    if all(key is not None for key in header_keys):
+        return 'columns', header_keys
+    row_keys = [period_key(label) for label in df.iloc[:, 0]]
+    if all(key is not None for key in row_keys):
+        return 'rows', row_keys
+    return None
+
+def matches(df, report_type, from_key, to_key):
+    """Các kỳ trong bảng đều nằm trong khoảng [from_key, to_key] được yêu cầu (và là kỳ tháng nếu
+    report_type = '2'). Bảng kỳ mặc định của trang trả về khi form bị bỏ qua không qua được kiểm tra này."""
+    parsed = period_keys(df)
+    if parsed is None:
+        return False
+    keys = parsed[1]
+    if any(key < from_key or key > to_key for key in keys):
+        return False
+    return report_type != '2' or all(key % 100 for key in keys)
+
+def to_long(df):
+    """Bảng vietstock (dạng chữ) thành (orientation, corner, DataFrame long); None nếu không nhận ra cột kỳ"""
+    parsed = period_keys(df)
+    if parsed is None:
+        return None
+    orientation = parsed[0]
+    corner = str(df.columns[0])
+
+    if orientation == 'columns':
+        long = df.melt(id_vars=df.columns[0], var_name='period', value_name='text')
+        long = long.rename(columns={df.columns[0]: 'indicator'})
+    else:
+        long = df.melt(id_vars=df.columns[0], var_name='indicator', value_name='text')
+        long = long.rename(columns={df.columns[0]: 'period'})
+
+    # Thứ tự chỉ tiêu như bảng gốc; chỉ tiêu trùng tên được đánh số để không ghi đè nhau
+    indicators = pd.Series(pd.unique(long['indicator'].astype(str)))
+    seq = {name: i for i, name in enumerate(indicators)}
+    long['indicator'] = long['indicator'].astype(str)
+    duplicate = long.groupby(['period', 'indicator'], sort=False).cumcount()
+    long['indicator_seq'] = long['indicator'].map(seq)
+    long.loc[duplicate > 0, 'indicator'] = long['indicator'] + ' (' + (duplicate + 1).astype(str) + ')'
+    long.loc[duplicate > 0, 'indicator_seq'] += len(seq) * duplicate
+
+    long['period'] = long['period'].astype(str)
+    long['period_key'] = long['period'].map(period_key)
+    decimal = decimal_mark(long['text'])
+    long['value'] = long['text'].map(lambda text: to_number(text, decimal))
+    return orientation, corner, long[['period_key', 'period', 'indicator', 'indicator_seq', 'value']]
+
+def covered(url, report_type, from_key, to_key, ttl=MACRO_CACHE_TTL):
+    """Khoảng [from_key, to_key] đã nằm trong một lần tải còn hạn hay chưa"""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            'SELECT 1 FROM macro_ranges WHERE url = ? AND report_type = ? AND from_key <= ? AND to_key >= ? '
+            'AND fetched_at > ? LIMIT 1',
+            (url, report_type, from_key, to_key, time.time() - ttl),
+        ).fetchone()
+    return row is not None
+
+def save(url, report_type, from_key, to_key, df):
+    """Lưu bảng vừa tải cho khoảng [from_key, to_key]; trả về False (không lưu gì) nếu không nhận ra
+    cấu trúc bảng hoặc các kỳ trong bảng nằm ngoài khoảng, để bảng kỳ mặc định không bị ghi thay số liệu."""
+    if not matches(df, report_type, from_key, to_key):
+        return False
+    parsed = to_long(df)
+    orientation, corner, long = parsed
+    rows = [
+        (url, report_type, int(key), period, indicator, int(seq), None if pd.isna(value) else float(value))
+        for key, period, indicator, seq, value in long.itertuples(index=False)
+    ]
+    with closing(_connect()) as conn, conn:
+        # Lần tải mới thay thế toàn bộ số liệu cũ trong khoảng (số liệu vĩ mô có thể được điều chỉnh)
+        conn.execute(
+            'DELETE FROM macro_values WHERE url = ? AND report_type = ? AND period_key BETWEEN ? AND ?',
+            (url, report_type, from_key, to_key),
+        )
+        conn.executemany('INSERT OR REPLACE INTO macro_values VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.execute('INSERT OR REPLACE INTO macro_ranges VALUES (?, ?, ?, ?, ?)',
+                     (url, report_type, from_key, to_key, time.time()))
+        conn.execute('INSERT OR REPLACE INTO macro_tables VALUES (?, ?, ?, ?)',
+                     (url, report_type, orientation, corner))
+    return True
+
+def query(url, report_type, from_key, to_key):
+    """Số liệu đã lưu trong khoảng [from_key, to_key] dạng long (period_key, period, indicator, value)"""
+    with closing(_connect()) as conn:
+        return pd.read_sql_query(
+            'SELECT period_key, period, indicator, indicator_seq, value FROM macro_values '
+            'WHERE url = ? AND report_type = ? AND period_key BETWEEN ? AND ? ORDER BY period_key, indicator_seq',
+            conn, params=(url, report_type, from_key, to_key),
+        )
+
+def load(url, report_type, from_key, to_key):
+    """Bảng số liệu đã lưu theo cùng hướng với bảng vietstock, các kỳ xếp tăng dần"""
+    with closing(_connect()) as conn:
+        table = conn.execute(
+            'SELECT orientation, corner FROM macro_tables WHERE url = ? AND report_type = ?', (url, report_type)
+        ).fetchone()
+    long = query(url, report_type, from_key, to_key)
+    if table is None:
+        return pd.DataFrame()
+    orientation, corner = table
+
+    periods = long.drop_duplicates('period_key')['period'].tolist()
+    indicators = long.sort_values('indicator_seq').drop_duplicates('indicator')['indicator'].tolist()
+    if orientation == 'columns':
+        wide = long.pivot(index='indicator', columns='period', values='value').reindex(index=indicators, columns=periods)
+    else:
+        wide = long.pivot(index='period', columns='indicator', values='value').reindex(index=periods, columns=indicators)
+    wide.columns.name = None
+    return wide.rename_axis(corner).reset_index()
@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa trong process
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from stock_app.static.finance_py.const import OHLCV_MMAP_CACHE_SIZE
+from stock_app.static.finance_py.storage import cache_path
+
+# Mỗi mã được lưu thành một file .npy gồm các cột có độ rộng cố định, đọc bằng memory-map
+OHLCV_DTYPE = np.dtype([
+    ('date', 'M8[D]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'i8'),
+])
+
+_mmaps = OrderedDict()  # symbol -> (mtime_ns, size, memmap), mã dùng gần nhất ở cuối
+_mmaps_guard = threading.Lock()
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _paths(symbol):
+    directory = cache_path('ohlcv')
+    os.makedirs(directory, exist_ok=True)
+    return tuple(os.path.join(directory, f'{symbol}.{extension}') for extension in ('npy', 'json', 'lock'))
+
+def _atomic_write(path, write):
+    # Ghi ra file tạm rồi đổi tên để các process đang đọc không thấy file ghi dở
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+@contextmanager
+def lock(symbol):
+    """Khóa theo mã giữa các thread và giữa các process (flock trên file .lock), tránh hai nơi cùng tải / ghi
+    một mã"""
+    with _locks_guard:
+        thread_lock = _locks.setdefault(symbol, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(_paths(symbol)[2], 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+def meta(symbol):
+    """Thông tin của mã đã lưu ({'checked_through': 'YYYY-MM-DD'}) hoặc None"""
+    try:
+        with open(_paths(symbol)[1]) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def read(symbol, fromdate=None, todate=None):
+    """Trả về mảng (memory-map, không sao chép) các phiên trong [fromdate, todate] của mã"""
+    data_path = _paths(symbol)[0]
+    try:
+        stat = os.stat(data_path)
+    except FileNotFoundError:
+        return np.empty(0, dtype=OHLCV_DTYPE)
+
+    with _mmaps_guard:
+        cached = _mmaps.get(symbol)
+        # append() ghi dòng mới trước rồi mới sửa header: nạp lại nếu số dòng chưa khớp kích thước file
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size) or \
+                cached[2].offset + cached[2].nbytes != stat.st_size:
+            cached = (stat.st_mtime_ns, stat.st_size, np.load(data_path, mmap_mode='r'))
+            _mmaps[symbol] = cached
+        _mmaps.move_to_end(symbol)
+        # Giới hạn số file đang mở; mảng đã trả cho người gọi vẫn dùng được đến khi không còn tham chiếu
+        while len(_mmaps) > OHLCV_MMAP_CACHE_SIZE:
+            _mmaps.popitem(last=False)
+    bars = cached[2]
+
+    # Tìm nhị phân trên cột ngày đã sắp xếp
+    dates = bars['date']
+    start = 0 if fromdate is None else np.searchsorted(dates, np.datetime64(fromdate, 'D'), side='left')
+    end = len(bars) if todate is None else np.searchsorted(dates, np.datetime64(todate, 'D'), side='right')
+    return bars[start:end]
+
+def last_date(symbol):
+    bars = read(symbol)
+    return bars['date'][-1] if len(bars) else None
+
+def to_bars(df):
+    """Chuyển DataFrame (date, open, high, low, close, Volume) thành mảng OHLCV"""
+    bars = np.empty(len(df), dtype=OHLCV_DTYPE)
+    bars['date'] = pd.to_datetime(df['date']).to_numpy(dtype='M8[D]')
+    for column in ('open', 'high', 'low', 'close'):
+        bars[column] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='f8')
+    bars['volume'] = pd.to_numeric(df['Volume'], errors='coerce').fillna(0).to_numpy(dtype='i8')
+    return bars
+
+def to_frame(bars):
+    """Chuyển mảng OHLCV thành DataFrame với cột giống price_stock()"""
+    return pd.DataFrame({
+        'date': bars['date'].astype('M8[ns]'),
+        'open': bars['open'],
+        'high': bars['high'],
+        'low': bars['low'],
+        'close': bars['close'],
+        'Volume': bars['volume'],
+    })
+
+def _append_rows(data_path, bars):
+    """Ghi `bars` vào cuối file .npy rồi sửa số dòng trong header tại chỗ (np.save chừa sẵn chỗ cho số dòng
+    dài hơn). False nếu file không ghi nối được, khi đó cần ghi lại cả file."""
+    with open(data_path, 'r+b') as file:
+        if np.lib.format.read_magic(file) != (1, 0):
+            return False
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        offset = file.tell()
+        if dtype != OHLCV_DTYPE or fortran_order or len(shape) != 1:
+            return False
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, {
+            'descr': np.lib.format.dtype_to_descr(OHLCV_DTYPE),
+            'fortran_order': False,
+            'shape': (shape[0] + len(bars),),
+        })
+        if header.tell() != offset:
+            return False
+
+        # Bỏ phần ghi dở (nếu có) của lần ghi trước, các dòng cũ và memory-map đang mở không bị đụng tới
+        file.seek(offset + shape[0] * OHLCV_DTYPE.itemsize)
+        file.truncate()
+        file.write(bars.tobytes())
+        file.flush()
+        file.seek(0)
+        file.write(header.getvalue())
+    return True
+
+def append(symbol, bars, checked_through):
+    """Nối các phiên mới hơn phiên cuối đã lưu và cập nhật ngày đã kiểm tra (gọi trong lock(symbol)).
+
+    Chỉ ghi thêm các dòng mới vào cuối file, không ghi lại toàn bộ lịch sử.
+    """
+    data_path, meta_path, _ = _paths(symbol)
+    stored = read(symbol)
+    if len(stored):
+        bars = bars[bars['date'] > stored['date'][-1]]
+    if len(bars):
+        bars = np.sort(bars, order='date').astype(OHLCV_DTYPE)
+        if not len(stored) or not _append_rows(data_path, bars):
+            combined = np.concatenate([np.asarray(stored), bars]) if len(stored) else bars
+            _atomic_write(data_path, lambda file: np.save(file, combined))
+
+    _atomic_write(meta_path, lambda file: file.write(json.dumps({'checked_through': checked_through}).encode()))
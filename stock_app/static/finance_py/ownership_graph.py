@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from stock_app.static.finance_py import finance_df, listing_index, rate_limit
+from stock_app.static.finance_py.const import (OWNERSHIP_CONTROL_THRESHOLD, OWNERSHIP_MAX_HOPS,
+                                              OWNERSHIP_MAX_WORKERS)
+from stock_app.static.finance_py.storage import cache_path
+
+GRAPH_NAME = 'ownership_graph.npz'
+
+_graph = None  # (mtime, OwnershipGraph)
+_lock = threading.Lock()
+
+
+def node_key(symbol, name):
+    """Khóa của một pháp nhân: mã cổ phiếu nếu có, nếu không thì tên đã bỏ dấu"""
+    symbol = '' if symbol is None or pd.isna(symbol) else str(symbol).strip().upper()
+    if symbol:
+        return symbol
+    return 'name:' + ' '.join(listing_index.fold(name or '').split())
+
+def crawl(symbols=None, max_workers=OWNERSHIP_MAX_WORKERS):
+    """Tải công ty con của các mã (mặc định toàn bộ mã niêm yết) song song.
+
+    Trả về DataFrame cạnh (parent, child, child_symbol, child_name, percentage, charter_capital).
+    """
+    universe = listing_index.get_index()
+    if symbols is None:
+        symbols = universe.companies['symbol'].dropna().tolist()
+    symbols = sorted({symbol.strip().upper() for symbol in symbols if symbol.strip()})
+    bucket = rate_limit.get_bucket('ssi')
+
+    def load(symbol):
+        if bucket:
+            bucket.acquire()
+        try:
+            return finance_df.sub_company_data(symbol)
+        except Exception as e:
+            print(f"Error fetching sub companies for {symbol}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(load, symbols))
+
+    frames = []
+    for symbol, df in zip(symbols, results):
+        if df is None or df.empty:
+            continue
+        frames.append(pd.DataFrame({
+            'parent': symbol,
+            'child_symbol': df.get('childSymbol'),
+            'child_name': df.get('childCompanyName'),
+            'percentage': pd.to_numeric(df.get('percentage'), errors='coerce'),
+            'charter_capital': pd.to_numeric(df.get('charterCapital'), errors='coerce'),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['parent', 'child', 'child_symbol', 'child_name', 'percentage', 'charter_capital'])
+    edges = pd.concat(frames, ignore_index=True)
+    edges['child'] = [node_key(symbol, name) for symbol, name in zip(edges['child_symbol'], edges['child_name'])]
+    return edges
+
+def build(edges, built_at=None):
+    """Dựng đồ thị CSR từ bảng cạnh của crawl(): hàng là công ty mẹ, cột là công ty con, giá trị là tỷ lệ sở hữu (0-1)"""
+    edges = edges[edges['parent'] != edges['child']].dropna(subset=['percentage'])
+    # SSI trả tỷ lệ theo phần trăm (0-100); tỷ lệ ngoài khoảng này là dữ liệu lỗi, bỏ qua
+    invalid = (edges['percentage'] < 0) | (edges['percentage'] > 100)
+    if invalid.any():
+        print(f"Skipping {int(invalid.sum())} holdings with percentage outside 0-100")
+    edges = edges[~invalid].assign(percentage=edges['percentage'][~invalid] / 100)
+    # Một cặp mẹ - con xuất hiện nhiều lần (vd. nhiều vai trò) chỉ giữ tỷ lệ lớn nhất
+    edges = edges.sort_values('percentage', ascending=False).drop_duplicates(['parent', 'child'])
+
+    universe = listing_index.get_index()
+    names = {key: name for key, name in zip(edges['child'], edges['child_name']) if isinstance(name, str)}
+    for parent in edges['parent'].unique():
+        record = universe.get(parent)
+        names[parent] = (record or {}).get('organName') or names.get(parent, '')
+
+    keys = np.array(sorted(set(edges['parent']) | set(edges['child'])), dtype=str)
+    parent = np.searchsorted(keys, edges['parent'].to_numpy(dtype=str))
+    child = np.searchsorted(keys, edges['child'].to_numpy(dtype=str))
+    order = np.lexsort((child, parent))
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parent, minlength=len(keys)), out=indptr[1:])
+
+    return OwnershipGraph(
+        keys=keys,
+        names=np.array([names.get(key, '') for key in keys], dtype=str),
+        indptr=indptr,
+        indices=child[order].astype(np.int32),
+        weights=edges['percentage'].to_numpy(dtype=float)[order],
+        capital=edges['charter_capital'].to_numpy(dtype=float)[order],
+        built_at=time.time() if built_at is None else built_at,
+    )
+
+
+class OwnershipGraph:
+    """Đồ thị sở hữu dạng CSR: công ty con của nút i là indices[indptr[i]:indptr[i + 1]],
+    tỷ lệ sở hữu tương ứng trong weights. Tra cứu hoàn toàn trên mảng, không gọi API."""
+
+    def __init__(self, keys, names, indptr, indices, weights, capital, built_at):
+        self.keys = keys
+        self.names = names
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.capital = capital
+        self.built_at = float(built_at)
+        self._position = {key: i for i, key in enumerate(keys.tolist())}
+        self.matrix = csr_matrix((weights, indices, indptr), shape=(len(keys), len(keys)))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def save(self, path):
+        # Ghi file tạm rồi đổi tên để process khác không đọc phải file đang ghi dở
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, keys=self.keys, names=self.names, indptr=self.indptr, indices=self.indices,
+                 weights=self.weights, capital=self.capital, built_at=np.array(self.built_at))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def _node(self, symbol):
+        position = self._position.get(str(symbol).strip().upper())
+        if position is None:
+            position = self._position.get(node_key(None, symbol))
+        if position is None:
+            raise ValueError(f"{symbol} is not in the ownership graph.")
+        return position
+
+    def _frame(self, positions, **columns):
+        keys = self.keys[positions]
+        frame = pd.DataFrame({
+            'key': keys,
+            'symbol': np.where(np.char.startswith(keys, 'name:'), '', keys),
+            'name': self.names[positions],
+        })
+        for name, values in columns.items():
+            frame[name] = values
+        return frame
+
+    def subsidiaries(self, symbol):
+        """Công ty con trực tiếp với tỷ lệ sở hữu và vốn điều lệ"""
+        i = self._node(symbol)
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self._frame(self.indices[start:end], percentage=self.weights[start:end],
+                           charter_capital=self.capital[start:end])
+
+    def controlled(self, symbol, hops=OWNERSHIP_MAX_HOPS, threshold=OWNERSHIP_CONTROL_THRESHOLD):
+        """Các pháp nhân do `symbol` kiểm soát trong tối đa `hops` bước.
+
+        Một pháp nhân bị kiểm soát khi tổng tỷ lệ do `symbol` và các công ty nó đã kiểm soát cùng nắm
+        đạt `threshold`. Cột hops là bước phát hiện, held là tổng tỷ lệ đó.
+        """
+        start = self._node(symbol)
+        controlled = np.zeros(len(self.keys), dtype=bool)
+        controlled[start] = True
+        found_hop = np.zeros(len(self.keys), dtype=np.int64)
+        held = np.zeros(len(self.keys))
+        for hop in range(1, hops + 1):
+            # Tổng tỷ lệ nắm giữ bởi nhóm đang kiểm soát: một phép nhân ma trận thưa với vector
+            held_now = self.matrix.T @ controlled.astype(float)
+            new = (held_now >= threshold) & ~controlled
+            if not new.any():
+                break
+            controlled |= new
+            found_hop[new] = hop
+            held[new] = held_now[new]
+        controlled[start] = False
+        positions = np.flatnonzero(controlled)
+        result = self._frame(positions, hops=found_hop[positions], held=held[positions])
+        return result.sort_values(['hops', 'held'], ascending=[True, False], ignore_index=True)
+
+    def effective_ownership(self, symbol, hops=OWNERSHIP_MAX_HOPS):
+        """Tỷ lệ sở hữu hiệu dụng của `symbol` ở mọi pháp nhân trong tối đa `hops` bước:
+        tổng theo mọi đường đi của tích các tỷ lệ trên đường đi."""
+        start = self._node(symbol)
+        vector = np.zeros(len(self.keys))
+        vector[start] = 1.0
+        total = np.zeros(len(self.keys))
+        transposed = self.matrix.T.tocsr()
+        for _ in range(hops):
+            vector = transposed @ vector
+            if not vector.any():
+                break
+            total += vector
+        total[start] = 0.0
+        positions = np.flatnonzero(total)
+        result = self._frame(positions, effective=total[positions])
+        return result.sort_values('effective', ascending=False, ignore_index=True)
+
+
+def build_and_save(symbols=None, max_workers=OWNERSHIP_MAX_WORKERS):
+    """Tải công ty con của toàn bộ mã, dựng đồ thị và lưu vào CACHE_DIR (dùng trong lệnh build_ownership_graph)"""
+    graph = build(crawl(symbols, max_workers))
+    graph.save(cache_path(GRAPH_NAME))
+    return graph
+
+def get_graph():
+    """Đồ thị đã dựng (đọc lại khi file trên đĩa được dựng lại); ValueError nếu chưa dựng"""
+    global _graph
+    path = cache_path(GRAPH_NAME)
+    if not os.path.exists(path):
+        raise ValueError("Ownership graph has not been built yet (run manage.py build_ownership_graph).")
+    mtime = os.path.getmtime(path)
+    with _lock:
+        if _graph is None or _graph[0] != mtime:
+            _graph = (mtime, OwnershipGraph.load(path))
+        return _graph[1]
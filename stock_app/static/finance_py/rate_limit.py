@@ -0,0 +1,44 @@
+import threading
+import time
+
+from stock_app.static.finance_py.const import HOST_RATE_LIMITS
+
+
+class TokenBucket:
+    """Bộ giới hạn tốc độ kiểu token bucket, an toàn khi dùng từ nhiều thread.
+
+    `rate` là số request mỗi giây, `capacity` là số request tối đa được gửi dồn một lúc.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Chờ đến khi có token rồi lấy một token"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_bucket(host):
+    """Bucket dùng chung cho nguồn `host` trong toàn bộ process (None nếu không bị giới hạn)"""
+    if host not in HOST_RATE_LIMITS:
+        return None
+    with _buckets_lock:
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(*HOST_RATE_LIMITS[host])
+        return _buckets[host]
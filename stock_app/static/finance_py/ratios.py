@@ -0,0 +1,195 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from stock_app.static.finance_py import layout_store, statement_store
+from stock_app.static.finance_py.statement_labels import BANK_SYMBOLS
+
+# Các chỉ tiêu dùng trong công thức, tìm trong mẫu dòng đã lưu theo tên (đã bỏ tiền tố A./I./1./ - ).
+# Mỗi chỉ tiêu có danh sách tên ứng viên theo thứ tự ưu tiên: khớp nguyên tên trước, sau đó khớp phần đầu.
+ITEMS = {
+    False: {
+        'BS': {
+            'total_assets': ['tổng cộng tài sản'],
+            'equity': ['tổng vốn chủ sở hữu', 'vốn chủ sở hữu'],
+            'liabilities': ['tổng nợ phải trả', 'nợ phải trả'],
+            'current_assets': ['tổng tài sản ngắn hạn', 'tài sản ngắn hạn'],
+            'current_liabilities': ['nợ ngắn hạn'],
+        },
+        'IC': {
+            'revenue': ['doanh thu thuần'],
+            'gross_profit': ['lợi nhuận gộp'],
+            'net_income': ['lợi nhuận sau thuế của công ty mẹ', 'lợi nhuận sau thuế thu nhập doanh nghiệp'],
+        },
+    },
+    True: {
+        'BS': {
+            'total_assets': ['tổng cộng tài sản'],
+            'equity': ['tổng vốn chủ sở hữu', 'vốn chủ sở hữu'],
+            'liabilities': ['tổng nợ phải trả', 'nợ phải trả'],
+            'loans': ['cho vay khách hàng'],
+            'deposits': ['tiền gửi của khách hàng'],
+        },
+        'IC': {
+            'revenue': ['tổng thu nhập hoạt động'],
+            'net_interest_income': ['thu nhập lãi thuần'],
+            'net_income': ['lợi nhuận sau thuế của công ty mẹ', 'lợi nhuận sau thuế thu nhập doanh nghiệp'],
+        },
+    },
+}
+
+# Số kỳ trong một năm, dùng để năm hóa các chỉ tiêu kết quả kinh doanh khi tính ROE / ROA
+PERIODS_PER_YEAR = {'ANNUAL': 1, 'QUARTER': 4}
+
+_PREFIX = re.compile(r'^\s*(?:[A-Za-z0-9]+\.|-)\s*')
+
+
+def _normalize(name):
+    return _PREFIX.sub('', str(name)).strip().lower()
+
+def _divide(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+def _growth(values, previous):
+    """Tăng trưởng so với cùng kỳ năm trước; NaN nếu kỳ trước không có hoặc bằng 0"""
+    return _divide(values - previous, np.abs(previous))
+
+# Công thức cho doanh nghiệp thường và ngân hàng. `a` là dict tên chỉ tiêu -> mảng (mã x kỳ),
+# `flow` là các chỉ tiêu kết quả kinh doanh đã năm hóa, `prev` là giá trị cùng kỳ năm trước.
+FORMULAS = {
+    False: {
+        'roe': lambda a, flow, prev: _divide(flow['net_income'], a['equity']),
+        'roa': lambda a, flow, prev: _divide(flow['net_income'], a['total_assets']),
+        'gross_margin': lambda a, flow, prev: _divide(a['gross_profit'], a['revenue']),
+        'net_margin': lambda a, flow, prev: _divide(a['net_income'], a['revenue']),
+        'debt_to_equity': lambda a, flow, prev: _divide(a['liabilities'], a['equity']),
+        'current_ratio': lambda a, flow, prev: _divide(a['current_assets'], a['current_liabilities']),
+        'revenue_growth': lambda a, flow, prev: _growth(a['revenue'], prev['revenue']),
+        'net_income_growth': lambda a, flow, prev: _growth(a['net_income'], prev['net_income']),
+        'asset_growth': lambda a, flow, prev: _growth(a['total_assets'], prev['total_assets']),
+        'equity_growth': lambda a, flow, prev: _growth(a['equity'], prev['equity']),
+    },
+    True: {
+        'roe': lambda a, flow, prev: _divide(flow['net_income'], a['equity']),
+        'roa': lambda a, flow, prev: _divide(flow['net_income'], a['total_assets']),
+        # Ngân hàng không có lợi nhuận gộp: dùng tỷ trọng thu nhập lãi thuần trong tổng thu nhập hoạt động
+        'gross_margin': lambda a, flow, prev: _divide(a['net_interest_income'], a['revenue']),
+        'net_margin': lambda a, flow, prev: _divide(a['net_income'], a['revenue']),
+        'debt_to_equity': lambda a, flow, prev: _divide(a['liabilities'], a['equity']),
+        # Ngân hàng không tách ngắn hạn / dài hạn: dùng tỷ lệ cho vay trên tiền gửi (LDR)
+        'current_ratio': lambda a, flow, prev: _divide(a['loans'], a['deposits']),
+        'revenue_growth': lambda a, flow, prev: _growth(a['revenue'], prev['revenue']),
+        'net_income_growth': lambda a, flow, prev: _growth(a['net_income'], prev['net_income']),
+        'asset_growth': lambda a, flow, prev: _growth(a['total_assets'], prev['total_assets']),
+        'equity_growth': lambda a, flow, prev: _growth(a['equity'], prev['equity']),
+    },
+}
+
+RATIOS = list(FORMULAS[False])
+
+
+def _resolve(names, candidates):
+    """itemCode đầu tiên có tên khớp với ứng viên (khớp nguyên tên trước, rồi khớp phần đầu)"""
+    for candidate in candidates:
+        exact = names.index[names == candidate]
+        if len(exact):
+            return exact[0]
+    for candidate in candidates:
+        prefix = names.index[names.str.startswith(candidate)]
+        if len(prefix):
+            return prefix[0]
+    return None
+
+def item_map():
+    """Bảng (bank, statement, model, itemCode, item) từ các mẫu dòng đã lưu trong layout_store"""
+    rows = []
+    for key, layout in layout_store.all_layouts().items():
+        bank, statement, model = layout_store.parse_key(key)
+        items = ITEMS[bank].get(statement)
+        if not items:
+            continue
+        names = pd.Series([_normalize(name) for name in layout['Name']], index=layout['itemCode'])
+        for item, candidates in items.items():
+            item_code = _resolve(names, candidates)
+            if item_code is not None:
+                rows.append((bank, statement, model, item_code, item))
+    return pd.DataFrame(rows, columns=['bank', 'statement', 'model', 'itemCode', 'item'])
+
+def item_arrays(report_type='ANNUAL', symbols=None, fromdate=None, todate=None):
+    """Các chỉ tiêu trong kho báo cáo dưới dạng mảng căn theo (mã x kỳ).
+
+    Trả về (items: {tên: mảng 2 chiều}, symbols, periods, bank: mảng bool theo mã).
+    """
+    mapping = item_map()
+    frames = []
+    for statement in ('BS', 'IC'):
+        codes = mapping.loc[mapping['statement'] == statement, 'itemCode'].unique().tolist()
+        if codes:
+            frames.append(statement_store.query(symbols, report_type, statement, item_codes=codes,
+                                                fromdate=fromdate, todate=todate))
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=statement_store.COLUMNS)
+    if data.empty:
+        # Chưa có mẫu dòng hoặc số liệu nào trong kho
+        return {}, np.array([], dtype=object), pd.DatetimeIndex([]), np.array([], dtype=bool)
+
+    # Gắn tên chỉ tiêu theo (ngân hàng / thường, loại báo cáo, modelType, itemCode)
+    data['bank'] = data['symbol'].isin(BANK_SYMBOLS)
+    models = data['modelType'].astype(object).where(data['modelType'].notna(), data['symbol'])
+    data['model'] = models.map({model: layout_store.model_name(model) for model in pd.unique(models)})
+    data = data.merge(mapping, on=['bank', 'statement', 'model', 'itemCode'])
+
+    symbol_index, symbol_values = pd.factorize(data['symbol'], sort=True)
+    period_index, period_values = pd.factorize(data['fiscalDate'], sort=True)
+    item_index, item_values = pd.factorize(data['item'])
+
+    values = np.full((len(item_values), len(symbol_values), len(period_values)), np.nan)
+    values[item_index, symbol_index, period_index] = pd.to_numeric(data['numericValue'], errors='coerce')
+
+    items = {item: values[i] for i, item in enumerate(item_values)}
+    bank = np.isin(symbol_values, list(BANK_SYMBOLS))
+    return items, np.asarray(symbol_values), pd.to_datetime(np.asarray(period_values)), bank
+
+def ratio_arrays(report_type='ANNUAL', symbols=None, fromdate=None, todate=None):
+    """Tính tất cả các chỉ số cho mọi mã và mọi kỳ một lượt trên mảng (mã x kỳ).
+
+    Trả về ({tên chỉ số: mảng 2 chiều}, symbols, periods).
+    """
+    if report_type not in PERIODS_PER_YEAR:
+        raise ValueError("Invalid report_type parameter.")
+    items, symbol_values, periods, bank = item_arrays(report_type, symbols, fromdate, todate)
+    shape = (len(symbol_values), len(periods))
+    empty = np.full(shape, np.nan)
+    arrays = {item: items.get(item, empty) for group in ITEMS.values() for statement in group.values()
+              for item in statement}
+
+    # Cùng kỳ năm trước: kỳ có ngày kết thúc lùi đúng một năm
+    previous_dates = (periods - pd.DateOffset(years=1)).to_numpy()
+    position = np.searchsorted(periods.to_numpy(), previous_dates)
+    found = (position < len(periods)) & (periods.to_numpy()[np.minimum(position, len(periods) - 1)] == previous_dates)
+    previous = {}
+    for item, values in arrays.items():
+        shifted = np.full(shape, np.nan)
+        shifted[:, found] = values[:, position[found]]
+        previous[item] = shifted
+
+    flows = {item: arrays[item] * PERIODS_PER_YEAR[report_type] for item in ('net_income',)}
+
+    ratios = {}
+    for name in RATIOS:
+        normal = FORMULAS[False][name](arrays, flows, previous)
+        banks = FORMULAS[True][name](arrays, flows, previous)
+        ratios[name] = np.where(bank[:, None], banks, normal)
+    return ratios, symbol_values, periods
+
+def ratio_table(report_type='ANNUAL', symbols=None, fromdate=None, todate=None):
+    """Bảng chỉ số tài chính với index (symbol, fiscalDate) và một cột cho mỗi chỉ số trong RATIOS.
+
+    Chỉ dùng số liệu đã có trong kho báo cáo (statement_store), không gọi API. Ngân hàng dùng bộ
+    công thức riêng: gross_margin là tỷ trọng thu nhập lãi thuần, current_ratio là tỷ lệ cho vay / tiền gửi.
+    """
+    ratios, symbol_values, periods = ratio_arrays(report_type, symbols, fromdate, todate)
+    index = pd.MultiIndex.from_product([symbol_values, periods], names=['symbol', 'fiscalDate'])
+    table = pd.DataFrame({name: values.ravel() for name, values in ratios.items()}, index=index)
+    return table.dropna(how='all')
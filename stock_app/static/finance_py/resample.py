@@ -0,0 +1,54 @@
+import pandas as pd
+
+# Chu kỳ gộp nến: D (ngày, giữ nguyên), W (tuần), M (tháng), Q (quý)
+PERIODS = {'D': None, 'W': 'W-SUN', 'M': 'M', 'Q': 'Q'}
+
+# calendar: nến được đặt nhãn theo ngày cuối kỳ lịch (chủ nhật, cuối tháng, cuối quý)
+# trading: nến được đặt nhãn theo phiên giao dịch cuối cùng thực tế trong kỳ
+ANCHORS = ('calendar', 'trading')
+
+
+def resample_ohlcv(df, period='D', anchor='calendar'):
+    """Gộp nến ngày của price_stock() / price_panel() thành nến tuần, tháng hoặc quý.
+
+    Mỗi kỳ lấy open đầu kỳ, high lớn nhất, low nhỏ nhất, close cuối kỳ, tổng Volume
+    và VWAP theo giá điển hình (high + low + close) / 3. Panel nhiều mã được gộp
+    trong một lần groupby theo (symbol, kỳ).
+    """
+    period = period.upper()
+    if period not in PERIODS:
+        raise ValueError("Invalid period parameter.")
+    if anchor not in ANCHORS:
+        raise ValueError("Invalid anchor parameter.")
+    if PERIODS[period] is None or df.empty:
+        return df
+
+    # Panel có MultiIndex (symbol, date) được đưa về dạng cột để groupby một lần
+    is_panel = isinstance(df.index, pd.MultiIndex)
+    bars = df.reset_index() if is_panel else df
+    keys = ['symbol'] if is_panel else []
+    bars = bars.sort_values(keys + ['date'])
+
+    dates = pd.to_datetime(bars['date'])
+    bucket = dates.dt.to_period(PERIODS[period]).dt.end_time.dt.normalize()
+    typical_value = (bars['high'] + bars['low'] + bars['close']) / 3 * bars['Volume']
+
+    grouped = bars.assign(_bucket=bucket.to_numpy(), _pv=typical_value.to_numpy(), _date=dates.to_numpy()) \
+        .groupby(keys + ['_bucket'], sort=False, observed=True)
+    result = grouped.agg(
+        _last=('_date', 'last'),
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        Volume=('Volume', 'sum'),
+        _pv=('_pv', 'sum'),
+    ).reset_index()
+
+    result['VWAP'] = result['_pv'] / result['Volume'].where(result['Volume'] != 0)
+    result['date'] = result['_last'] if anchor == 'trading' else result['_bucket']
+    result = result[keys + ['date', 'open', 'high', 'low', 'close', 'Volume', 'VWAP']]
+
+    if is_panel:
+        return result.set_index(['symbol', 'date'])
+    return result
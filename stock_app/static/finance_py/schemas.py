@@ -0,0 +1,93 @@
+import pandas as pd
+
+DATE = 'datetime64[ns]'
+CATEGORY = 'category'
+FLOAT = 'float64'
+INT = 'int64'
+
+# Kiểu dữ liệu của từng cột trong kết quả mỗi hàm lấy dữ liệu.
+# Giá và tỷ giá giữ float64 để khi xuất CSV không bị sai số làm tròn của float32.
+SCHEMAS = {
+    'exchange_rate': {
+        'Date': DATE,
+        'Currency Name': CATEGORY,
+        'Currency Code': CATEGORY,
+        'Cash': FLOAT,
+        'Transfer': FLOAT,
+        'Sell': FLOAT,
+    },
+    'gold_sjc': {
+        'BranchName': CATEGORY,
+        'BuyValue': FLOAT,
+        'SellValue': FLOAT,
+        'Date': DATE,
+    },
+    'price_stock': {
+        'date': DATE,
+        'open': FLOAT,
+        'high': FLOAT,
+        'low': FLOAT,
+        'close': FLOAT,
+        'Volume': INT,
+    },
+    # Các cột kỳ báo cáo (Năm 2024, Q1 2024, ...) được đổi sang float64 theo DEFAULTS
+    'financial_report': {
+        'Name': object,
+    },
+    'industries_company': {
+        'board': CATEGORY,
+        'icbName2': CATEGORY,
+        'icbName3': CATEGORY,
+        'icbName4': CATEGORY,
+    },
+    'company_overview': {
+        'exchange': CATEGORY,
+        'industry': CATEGORY,
+        'companyType': CATEGORY,
+        'noShareholders': FLOAT,
+        'foreignPercent': FLOAT,
+        'outstandingShare': FLOAT,
+        'issueShare': FLOAT,
+        'establishedYear': FLOAT,
+        'noEmployees': FLOAT,
+        'stockRating': FLOAT,
+        'deltaInWeek': FLOAT,
+        'deltaInMonth': FLOAT,
+        'deltaInYear': FLOAT,
+    },
+    'sub_company': {
+        'Vốn điều lệ': FLOAT,
+        'Phần trăm': FLOAT,
+        'Vai trò': CATEGORY,
+    },
+}
+
+# Kiểu mặc định cho các cột không khai báo trong SCHEMAS
+DEFAULTS = {
+    'financial_report': FLOAT,
+}
+
+
+def _convert(column, dtype):
+    if dtype == DATE:
+        return pd.to_datetime(column)
+    if dtype == CATEGORY:
+        return column.astype(CATEGORY)
+    if dtype == INT:
+        return pd.to_numeric(column, errors='coerce').fillna(0).astype(INT)
+    if dtype == FLOAT:
+        return pd.to_numeric(column, errors='coerce').astype(FLOAT)
+    return column.astype(dtype)
+
+def apply_schema(df, name):
+    """Đổi kiểu các cột của `df` theo schema `name` (một lần, ngay khi tạo DataFrame)"""
+    if df.empty and not len(df.columns):
+        return df
+    schema = SCHEMAS[name]
+    default = DEFAULTS.get(name)
+    df = df.copy()
+    for column in df.columns:
+        dtype = schema.get(column, default)
+        if dtype is not None and df[column].dtype != dtype:
+            df[column] = _convert(df[column], dtype)
+    return df
@@ -0,0 +1,115 @@
+import time
+from collections import Counter
+from contextlib import closing
+
+import pandas as pd
+
+from stock_app.static.finance_py.const import STATEMENT_EMPTY_TTL
+from stock_app.static.finance_py.storage import connect
+
+DB_NAME = 'financial_statements.sqlite3'
+
+# Số liệu báo cáo tài chính dạng long: mỗi dòng là một chỉ tiêu (item_code) của một mã trong một kỳ.
+# item_code không khai báo kiểu để SQLite giữ nguyên kiểu số / chuỗi như API trả về.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statement_values (
+    symbol TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    fiscal_date TEXT NOT NULL,
+    item_code NOT NULL,
+    model_type,
+    value REAL,
+    PRIMARY KEY (symbol, report_type, statement, fiscal_date, item_code)
+);
+CREATE INDEX IF NOT EXISTS statement_values_item ON statement_values (item_code);
+CREATE INDEX IF NOT EXISTS statement_values_date ON statement_values (fiscal_date);
+-- Mỗi kỳ đã hỏi API được ghi lại; kỳ chưa có số liệu (row_count = 0) được hỏi lại sau STATEMENT_EMPTY_TTL
+CREATE TABLE IF NOT EXISTS statement_periods (
+    symbol TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    fiscal_date TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (symbol, report_type, statement, fiscal_date)
+);
+"""
+
+COLUMNS = ['symbol', 'report_type', 'statement', 'fiscalDate', 'itemCode', 'modelType', 'numericValue']
+
+
+def _connect():
+    return connect(DB_NAME, SCHEMA)
+
+def missing_dates(symbol, report_type, statement, fiscal_dates):
+    """Các kỳ trong `fiscal_dates` chưa có trong kho (hoặc đã hỏi nhưng chưa có số liệu và đã quá hạn)"""
+    if not fiscal_dates:
+        return []
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            'SELECT fiscal_date, row_count, checked_at FROM statement_periods '
+            'WHERE symbol = ? AND report_type = ? AND statement = ? AND fiscal_date BETWEEN ? AND ?',
+            (symbol, report_type, statement, min(fiscal_dates), max(fiscal_dates)),
+        ).fetchall()
+    now = time.time()
+    known = {fiscal_date for fiscal_date, row_count, checked_at in rows
+             if row_count > 0 or now - checked_at < STATEMENT_EMPTY_TTL}
+    return [fiscal_date for fiscal_date in fiscal_dates if fiscal_date not in known]
+
+def save(symbol, report_type, statement, fiscal_dates, df):
+    """Lưu kết quả API (các cột itemCode, fiscalDate, numericValue, modelType) cho các kỳ `fiscal_dates`"""
+    rows = []
+    if not df.empty:
+        df = df[df['fiscalDate'].isin(fiscal_dates)]
+        model_types = df['modelType'].tolist() if 'modelType' in df.columns else [None] * len(df)
+        values = pd.to_numeric(df['numericValue'], errors='coerce').astype(object)
+        rows = [
+            (symbol, report_type, statement, fiscal_date, item_code,
+             None if pd.isna(model_type) else model_type, None if pd.isna(value) else value)
+            for fiscal_date, item_code, model_type, value
+            in zip(df['fiscalDate'].tolist(), df['itemCode'].tolist(), model_types, values.tolist())
+        ]
+    counts = Counter(row[3] for row in rows)
+    now = time.time()
+
+    with closing(_connect()) as conn, conn:
+        conn.executemany('INSERT OR REPLACE INTO statement_values VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.executemany(
+            'INSERT OR REPLACE INTO statement_periods VALUES (?, ?, ?, ?, ?, ?)',
+            [(symbol, report_type, statement, fiscal_date, counts[fiscal_date], now) for fiscal_date in fiscal_dates],
+        )
+
+def query(symbols=None, report_type=None, statement=None, fiscal_dates=None, item_codes=None,
+          fromdate=None, todate=None):
+    """Đọc số liệu đã lưu (không gọi API), lọc theo mã, loại báo cáo, kỳ, chỉ tiêu.
+
+    Trả về DataFrame dạng long với các cột COLUMNS.
+    """
+    sql = ('SELECT symbol, report_type, statement, fiscal_date, item_code, model_type, value '
+           'FROM statement_values WHERE 1 = 1')
+    params = []
+    for column, values in (('symbol', symbols), ('fiscal_date', fiscal_dates), ('item_code', item_codes)):
+        if values is not None:
+            values = list(values)
+            sql += f' AND {column} IN ({",".join("?" * len(values))})'
+            params.extend(values)
+    for column, value in (('report_type', report_type), ('statement', statement)):
+        if value is not None:
+            sql += f' AND {column} = ?'
+            params.append(value)
+    if fromdate:
+        sql += ' AND fiscal_date >= ?'
+        params.append(fromdate)
+    if todate:
+        sql += ' AND fiscal_date <= ?'
+        params.append(todate)
+
+    with closing(_connect()) as conn:
+        rows = conn.execute(sql + ' ORDER BY symbol, fiscal_date', params).fetchall()
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def load(symbol, report_type, statement, fiscal_dates):
+    """Số liệu của một mã trong các kỳ `fiscal_dates` (cột itemCode, fiscalDate, numericValue, modelType)"""
+    df = query([symbol], report_type, statement, fiscal_dates)
+    return df[['itemCode', 'fiscalDate', 'numericValue', 'modelType']]
@@ -0,0 +1,19 @@
+import os
+import sqlite3
+
+from stock_app.static.finance_py.const import CACHE_DIR
+
+
+def cache_path(name):
+    """Trả về đường dẫn file `name` trong thư mục cache, tạo thư mục nếu chưa có"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+def connect(name, schema=None):
+    """Mở kết nối SQLite tới file cache `name`, tạo bảng theo `schema` nếu cần"""
+    conn = sqlite3.connect(cache_path(name), timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')  # Cho phép đọc song song khi đang ghi
+    conn.execute('PRAGMA synchronous=NORMAL')
+    if schema:
+        conn.executescript(schema)
+    return conn
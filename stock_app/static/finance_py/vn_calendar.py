@@ -0,0 +1,261 @@
+import math
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from stock_app.static.finance_py.storage import connect
+
+# Lịch giao dịch HOSE và lịch làm việc của ngân hàng
+HOSE = 'hose'
+BANK = 'bank'
+CALENDARS = (HOSE, BANK)
+
+# Số ngày làm việc đầu tuần theo quy tắc: HOSE giao dịch thứ 2 - thứ 6,
+# ngân hàng còn làm việc (và niêm yết tỷ giá) sáng thứ 7
+WORKDAYS = {HOSE: 5, BANK: 6}
+
+# Loại ngày: 0-6 là thứ 2 - chủ nhật, HOLIDAY là ngày lễ. Ngày mở theo quy tắc khi loại < WORKDAYS[lịch]
+HOLIDAY = 7
+
+TIMEZONE = 7.0  # Múi giờ Việt Nam, dùng cho lịch âm
+
+DB_NAME = 'calendar.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendar_overrides (
+    calendar TEXT NOT NULL,
+    date TEXT NOT NULL,
+    is_open INTEGER NOT NULL,
+    PRIMARY KEY (calendar, date)
+);
+"""
+
+# Thuật toán đổi lịch âm - dương của Hồ Ngọc Đức (số ngày Julius)
+_JD_OFFSET = 1721425
+
+def _jd_from_date(day):
+    return day.toordinal() + _JD_OFFSET
+
+def _date_from_jd(jd):
+    return date.fromordinal(jd - _JD_OFFSET)
+
+def _new_moon_day(k):
+    T = k / 1236.85
+    T2 = T * T
+    T3 = T2 * T
+    dr = math.pi / 180
+    jd1 = 2415020.75933 + 29.53058868 * k + 0.0001178 * T2 - 0.000000155 * T3
+    jd1 += 0.00033 * math.sin((166.56 + 132.87 * T - 0.009173 * T2) * dr)
+    M = 359.2242 + 29.10535608 * k - 0.0000333 * T2 - 0.00000347 * T3
+    Mpr = 306.0253 + 385.81691806 * k + 0.0107306 * T2 + 0.00001236 * T3
+    F = 21.2964 + 390.67050646 * k - 0.0016528 * T2 - 0.00000239 * T3
+    C1 = (0.1734 - 0.000393 * T) * math.sin(M * dr) + 0.0021 * math.sin(2 * dr * M)
+    C1 -= 0.4068 * math.sin(Mpr * dr) - 0.0161 * math.sin(dr * 2 * Mpr)
+    C1 -= 0.0004 * math.sin(dr * 3 * Mpr)
+    C1 += 0.0104 * math.sin(dr * 2 * F) - 0.0051 * math.sin(dr * (M + Mpr))
+    C1 -= 0.0074 * math.sin(dr * (M - Mpr)) + 0.0004 * math.sin(dr * (2 * F + M))
+    C1 -= 0.0004 * math.sin(dr * (2 * F - M)) - 0.0006 * math.sin(dr * (2 * F + Mpr))
+    C1 += 0.0010 * math.sin(dr * (2 * F - Mpr)) + 0.0005 * math.sin(dr * (2 * Mpr + M))
+    if T < -11:
+        delta_t = 0.001 + 0.000839 * T + 0.0002261 * T2 - 0.00000845 * T3 - 0.000000081 * T * T3
+    else:
+        delta_t = -0.000278 + 0.000265 * T + 0.000262 * T2
+    return math.floor(jd1 + C1 - delta_t + 0.5 + TIMEZONE / 24)
+
+def _sun_longitude(jdn):
+    T = (jdn - 2451545.5 - TIMEZONE / 24) / 36525
+    T2 = T * T
+    dr = math.pi / 180
+    M = 357.52910 + 35999.05030 * T - 0.0001559 * T2 - 0.00000048 * T * T2
+    L0 = 280.46645 + 36000.76983 * T + 0.0003032 * T2
+    DL = (1.914600 - 0.004817 * T - 0.000014 * T2) * math.sin(dr * M)
+    DL += (0.019993 - 0.000101 * T) * math.sin(dr * 2 * M) + 0.000290 * math.sin(dr * 3 * M)
+    L = (L0 + DL) * dr
+    L = L - math.pi * 2 * math.floor(L / (math.pi * 2))
+    return math.floor(L / math.pi * 6)
+
+def _lunar_month_11(year):
+    off = _jd_from_date(date(year, 12, 31)) - 2415021
+    k = math.floor(off / 29.530588853)
+    new_moon = _new_moon_day(k)
+    if _sun_longitude(new_moon) >= 9:
+        new_moon = _new_moon_day(k - 1)
+    return new_moon
+
+def _leap_month_offset(a11):
+    k = math.floor((a11 - 2415021.076998695) / 29.530588853 + 0.5)
+    i = 1
+    arc = _sun_longitude(_new_moon_day(k + i))
+    while True:
+        last = arc
+        i += 1
+        arc = _sun_longitude(_new_moon_day(k + i))
+        if arc == last or i >= 14:
+            break
+    return i - 1
+
+def lunar_to_solar(lunar_day, lunar_month, lunar_year, lunar_leap=False):
+    """Đổi ngày âm lịch sang dương lịch, trả về None nếu tháng nhuận không tồn tại"""
+    if lunar_month < 11:
+        a11 = _lunar_month_11(lunar_year - 1)
+        b11 = _lunar_month_11(lunar_year)
+    else:
+        a11 = _lunar_month_11(lunar_year)
+        b11 = _lunar_month_11(lunar_year + 1)
+    k = math.floor(0.5 + (a11 - 2415021.076998695) / 29.530588853)
+    off = lunar_month - 11
+    if off < 0:
+        off += 12
+    if b11 - a11 > 365:
+        leap_off = _leap_month_offset(a11)
+        leap_month = leap_off - 2
+        if leap_month < 0:
+            leap_month += 12
+        if lunar_leap and lunar_month != leap_month:
+            return None
+        if lunar_leap or off >= leap_off:
+            off += 1
+    month_start = _new_moon_day(k + off)
+    return _date_from_jd(month_start + lunar_day - 1)
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """Các ngày nghỉ lễ theo luật lao động trong năm `year` (kể cả ngày nghỉ bù)"""
+    new_year = lunar_to_solar(1, 1, year)
+    days = {
+        date(year, 1, 1),  # Tết Dương lịch
+        date(year, 4, 30),  # Giải phóng miền Nam
+        date(year, 5, 1),  # Quốc tế Lao động
+        date(year, 9, 2),  # Quốc khánh
+        lunar_to_solar(10, 3, year),  # Giỗ Tổ Hùng Vương
+    }
+    # Tết Nguyên đán: từ ngày cuối năm âm lịch đến hết mùng 3
+    days.update(new_year + timedelta(days=offset) for offset in range(-1, 3))
+
+    # Lễ rơi vào thứ 7, chủ nhật thì được nghỉ bù vào ngày làm việc kế tiếp
+    for day in sorted(days):
+        if day.weekday() >= 5:
+            substitute = day + timedelta(days=1)
+            while substitute.weekday() >= 5 or substitute in days:
+                substitute += timedelta(days=1)
+            days.add(substitute)
+    return frozenset(days)
+
+@lru_cache(maxsize=None)
+def _holiday_array(first_year, last_year):
+    days = set().union(*(holidays(year) for year in range(first_year, last_year + 1)))
+    return np.array(sorted(days), dtype='datetime64[D]')
+
+def _kinds(days):
+    """Loại của từng ngày trong mảng datetime64[D]"""
+    if not len(days):
+        return np.empty(0, dtype=np.int64)
+    weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 là thứ 5
+    years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+    holiday_days = _holiday_array(int(years.min()), int(years.max()))
+    found = np.minimum(np.searchsorted(holiday_days, days), len(holiday_days) - 1)
+    holiday = holiday_days[found] == days
+    return np.where(holiday, HOLIDAY, weekday)
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _check_calendar(calendar):
+    if calendar not in CALENDARS:
+        raise ValueError(f"Invalid calendar: {calendar}")
+
+def _learned(calendar, start, end):
+    with closing(connect(DB_NAME, SCHEMA)) as conn:
+        rows = conn.execute(
+            'SELECT date, is_open FROM calendar_overrides WHERE calendar = ? AND date BETWEEN ? AND ?',
+            (calendar, start.isoformat(), end.isoformat()),
+        ).fetchall()
+    return rows
+
+def overrides(calendar, fromdate, todate):
+    """Các ngày đã học được trong khoảng [fromdate, todate]: {date: is_open}"""
+    _check_calendar(calendar)
+    rows = _learned(calendar, _to_date(fromdate), _to_date(todate))
+    return {_to_date(day): bool(is_open) for day, is_open in rows}
+
+def record_overrides(calendar, days, is_open):
+    """Ghi nhận các ngày mà dữ liệu thực tế khác với quy tắc lịch, và mọi ngày nghỉ theo quy tắc đã được
+    kiểm tra (để open_days(probe=True) biết loại ngày nghỉ đó đã được hỏi)"""
+    _check_calendar(calendar)
+    days = np.unique(np.array([_to_date(day) for day in days], dtype='datetime64[D]'))
+    # Ngày mở theo quy tắc chỉ cần lưu khi thực tế đóng; ngày nghỉ theo quy tắc luôn được lưu
+    rule_open = _kinds(days) < WORKDAYS[calendar]
+    days = days[~rule_open] if is_open else days
+    if not len(days):
+        return
+    with closing(connect(DB_NAME, SCHEMA)) as conn, conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO calendar_overrides VALUES (?, ?, ?)',
+            [(calendar, str(day), int(is_open)) for day in days],
+        )
+
+def _open_mask(start, end, calendar, probe=False):
+    """(mảng ngày datetime64[D] trong [start, end], mảng bool ngày có thể có dữ liệu)"""
+    _check_calendar(calendar)
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    kinds = _kinds(days)
+    mask = kinds < WORKDAYS[calendar]
+    if not len(days):
+        return days, mask
+
+    # Khi thăm dò cần biết các ngày đã kiểm tra trong cả các năm của khoảng
+    first, last = (date(start.year, 1, 1), date(end.year, 12, 31)) if probe else (start, end)
+    rows = _learned(calendar, first, last)
+    learned_days = np.array([day for day, _ in rows], dtype='datetime64[D]')
+    learned_open = np.array([bool(value) for _, value in rows], dtype=bool)
+    position = (learned_days - days[0]).astype(np.int64)
+    inside = (position >= 0) & (position < len(days))
+    mask[position[inside]] = learned_open[inside]
+    if not probe:
+        return days, mask
+
+    # Thăm dò ngày nghỉ theo quy tắc chưa kiểm tra, theo từng (năm, loại ngày): loại đã có ngày thực tế mở
+    # thì hỏi hết các ngày còn lại; chưa có ngày nào được kiểm tra thì chỉ hỏi một ngày (gần nhất);
+    # đã kiểm tra và đều đóng thì bỏ qua
+    checked = np.zeros(len(days), dtype=bool)
+    checked[position[inside]] = True
+    candidates = ~mask & ~checked & (kinds >= WORKDAYS[calendar]) & (days < np.datetime64(date.today(), 'D'))
+    years = days.astype('datetime64[Y]')
+    learned_kinds = _kinds(learned_days)
+    learned_years = learned_days.astype('datetime64[Y]')
+    for year, kind in set(zip(years[candidates].tolist(), kinds[candidates].tolist())):
+        group = np.flatnonzero(candidates & (years == year) & (kinds == kind))
+        seen = (learned_years == year) & (learned_kinds == kind)
+        if learned_open[seen].any():
+            mask[group] = True
+        elif not seen.any():
+            mask[group[-1]] = True
+    return days, mask
+
+def is_open(day, calendar=HOSE):
+    day = _to_date(day)
+    return bool(_open_mask(day, day, calendar)[1][0])
+
+def open_days(fromdate, todate, calendar=HOSE, probe=False):
+    """Danh sách các ngày có thể có dữ liệu trong khoảng [fromdate, todate].
+
+    probe=True: hỏi thử một ngày nghỉ theo quy tắc (đã qua, chưa kiểm tra) của mỗi loại (thứ 7, chủ nhật,
+    ngày lễ) trong mỗi năm; loại nào thực tế có dữ liệu (vd. SJC niêm yết giá cả chủ nhật) thì các lần
+    sau hỏi hết các ngày loại đó, loại nào đóng thì không hỏi nữa.
+    """
+    days, mask = _open_mask(_to_date(fromdate), _to_date(todate), calendar, probe)
+    return days[mask].astype(object).tolist()
+
+def open_range(fromdate, todate, calendar=HOSE):
+    """(ngày mở đầu tiên, ngày mở cuối cùng) trong khoảng [fromdate, todate], None nếu không có"""
+    days, mask = _open_mask(_to_date(fromdate), _to_date(todate), calendar)
+    found = np.flatnonzero(mask)
+    if not len(found):
+        return None
+    return days[found[0]].astype(object), days[found[-1]].astype(object)
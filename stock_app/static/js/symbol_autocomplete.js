@@ -0,0 +1,36 @@
+// Gợi ý mã cho các ô nhập có data-autocomplete="symbol" (dùng /symbol-search/).
+// Ô nhập nhiều mã cách nhau bởi dấu phẩy chỉ gợi ý cho mã cuối cùng.
+document.querySelectorAll('input[data-autocomplete="symbol"]').forEach(function (input) {
+    var list = document.createElement('datalist');
+    list.id = input.id + '-suggestions';
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    input.after(list);
+
+    var timer = null;
+    var last = '';
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            var parts = input.value.split(',');
+            var query = parts.pop().trim();
+            var prefix = parts.length ? parts.join(',') + ', ' : '';
+            if (!query || query === last) {
+                return;
+            }
+            last = query;
+            fetch('/symbol-search/?limit=10&q=' + encodeURIComponent(query))
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    list.innerHTML = '';
+                    (data.results || []).forEach(function (row) {
+                        var option = document.createElement('option');
+                        option.value = prefix + row.symbol;
+                        option.label = row.symbol + ' - ' + (row.organName || '') + (row.board ? ' (' + row.board + ')' : '');
+                        list.appendChild(option);
+                    });
+                })
+                .catch(function () {});
+        }, 150);
+    });
+});
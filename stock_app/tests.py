@@ -1,3 +1,639 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import requests
+from django.test import SimpleTestCase
+from selenium.common.exceptions import TimeoutException
+
+from stock_app.static.finance_py import (correlation, finance_df, gold_store, layout_store, macro_form, macro_store,
+                                        ohlcv_store, ownership_graph, ratios, statement_store, storage,
+                                        vn_calendar)
+from stock_app.static.finance_py.indicators import add_indicators
+
+MACRO_TESTDATA = os.path.join(os.path.dirname(__file__), 'testdata', 'macro')
+RATIOS_TESTDATA = os.path.join(os.path.dirname(__file__), 'testdata', 'ratios')
+
+
+class _CacheDirMixin:
+    """Thư mục cache riêng cho mỗi test"""
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = mock.patch.object(storage, 'CACHE_DIR', cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+def _fixture(name):
+    with open(os.path.join(MACRO_TESTDATA, name), 'rb') as f:
+        return f.read()
+
+
+class _MacroHandler(BaseHTTPRequestHandler):
+    """Giả lập trang báo cáo vĩ mô: GET /macro trả form, POST /macro/data trả bảng theo chế độ của server"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send(_fixture('form.html'))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        fields = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        self.server.posted.append(fields)
+        mode = self.server.mode
+        if mode == 'ignore':
+            # Trang điền form bằng JS: bỏ qua các trường gửi lên, trả lại bảng kỳ mặc định
+            self._send(_fixture('form.html'))
+        elif mode == 'empty':
+            self._send(_fixture('no_data.html'))
+        elif mode == 'bad_columns':
+            # Trang đổi cấu trúc: số cột tiêu đề khác số ô dữ liệu
+            self._send(_fixture('bad_columns.html'))
+        elif fields.get('__RequestVerificationToken') != 'tok-123':
+            self.send_error(403)
+        else:
+            # 'ok' và 'stale' đều trả bảng T1-T3/2023; 'stale' dùng cho yêu cầu kỳ khác
+            self._send(_fixture('result_2023.html'))
+
+
+class MacroFormTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _MacroHandler)
+        cls.server.mode = 'ok'
+        cls.server.posted = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/macro'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.mode = 'ok'
+        self.server.posted = []
+        self.session = requests.Session()
+        self.addCleanup(self.session.close)
+
+    def test_has_table(self):
+        self.assertTrue(macro_form.has_table(_fixture('form.html')))
+        self.assertFalse(macro_form.has_table(_fixture('no_data.html')))
+        self.assertFalse(macro_form.has_table(b''))
+
+    def test_parse_table(self):
+        df = macro_form.parse_table(_fixture('result_2023.html'))
+        self.assertEqual(list(df.columns), ['Chỉ tiêu', 'T1/2023', 'T2/2023', 'T3/2023'])
+        self.assertEqual(df['Chỉ tiêu'].tolist(), ['CPI', 'Lạm phát cơ bản'])
+        self.assertEqual(df.loc[0, 'T3/2023'], '103,35')
+
+    def test_fetch_posts_form_with_token(self):
+        df = macro_form.fetch(self.session, self.url, '2', 2023, 2023, 1, 3)
+        self.assertIsNotNone(df)
+        self.assertEqual(list(df.columns[1:]), ['T1/2023', 'T2/2023', 'T3/2023'])
+        posted = self.server.posted[-1]
+        self.assertEqual(posted['__RequestVerificationToken'], 'tok-123')
+        self.assertEqual((posted['type'], posted['fromYear'], posted['toYear'], posted['from'], posted['to']),
+                         ('2', '2023', '2023', '1', '3'))
+
+    def test_fetch_returns_none_when_form_is_ignored(self):
+        self.server.mode = 'ignore'
+        self.assertIsNone(macro_form.fetch(self.session, self.url, '2', 2023, 2023, 1, 3))
+
+    def test_fetch_returns_none_when_periods_do_not_match(self):
+        self.server.mode = 'stale'
+        self.assertIsNone(macro_form.fetch(self.session, self.url, '2', 2024, 2024, 1, 3))
+
+    def test_fetch_returns_none_without_data(self):
+        self.server.mode = 'empty'
+        self.assertIsNone(macro_form.fetch(self.session, self.url, '2', 2023, 2023, 1, 3))
+
+    def test_http_report_falls_back_on_parse_error(self):
+        self.server.mode = 'bad_columns'
+        with self.assertRaises(ValueError):
+            macro_form.fetch(self.session, self.url, '2', 2023, 2023, 1, 3)
+        with mock.patch.object(finance_df.http_client, 'get_session', lambda name: self.session):
+            self.assertIsNone(finance_df._macro_report_http(self.url, '2', 2023, 2023, 1, 3))
+            with mock.patch.object(finance_df, '_macro_report_browser', return_value='browser') as browser:
+                self.assertEqual(finance_df.macroeconomics_report(self.url, '2', 2023, 2023, 1, 3), 'browser')
+                browser.assert_called_once()
+
+    def test_batch_skips_failing_report(self):
+        def fetch(url, *args):
+            if 'broken' in url:
+                raise RuntimeError('boom')
+            return pd.DataFrame({'Kỳ': ['2023'], 'CPI': ['1']})
+        urls = {'cpi': 'http://example.test/cpi.htm', 'broken': 'http://example.test/broken.htm'}
+        with mock.patch.object(finance_df, '_macro_report_http', side_effect=fetch), \
+                mock.patch.object(finance_df, '_macro_reports_browser', side_effect=RuntimeError('no chrome')):
+            result = finance_df.macroeconomics_reports('1', 2023, 2023, urls=urls)
+        self.assertEqual(list(result), ['cpi'])
+
+    def test_fetch_returns_none_for_unknown_option(self):
+        self.assertIsNone(macro_form.fetch(self.session, self.url, '2', 2019, 2023, 1, 3))
+        self.assertEqual(self.server.posted, [])
+
+
+class _UnchangedTableWait:
+    """WebDriverWait giả: trang đã tải, nhưng bảng không đổi sau khi nhấn "Xem" (hết giờ chờ)"""
+
+    def __init__(self, driver, timeout):
+        pass
+
+    def until(self, condition):
+        if getattr(condition, '__name__', '') == '<lambda>':
+            raise TimeoutException()
+        return True
+
+
+class MacroBrowserTimeoutTests(SimpleTestCase):
+
+    def _report(self, page, from_year, to_year):
+        driver = mock.Mock(page_source=page)
+        pool = mock.MagicMock()
+        pool.return_value.__enter__.return_value = driver
+        with mock.patch.object(finance_df.browser_pool, 'driver', pool), \
+                mock.patch.object(finance_df, 'WebDriverWait', _UnchangedTableWait), \
+                mock.patch.object(finance_df, '_submit_macro_form', return_value=page):
+            return finance_df._macro_report_browser('http://example.test/cpi.htm', '2', from_year, to_year, 1, 3)
+
+    def test_unchanged_table_with_requested_periods_is_used(self):
+        df = self._report(_fixture('result_2023.html').decode(), 2023, 2023)
+        self.assertEqual(list(df.columns[1:]), ['T1/2023', 'T2/2023', 'T3/2023'])
+
+    def test_unchanged_table_with_other_periods_raises(self):
+        with self.assertRaises(ValueError):
+            self._report(_fixture('form.html').decode(), 2023, 2023)
+
+
+class MacroStoreTests(_CacheDirMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = 'http://example.test/cpi.htm'
+
+    def test_save_and_load(self):
+        keys = macro_store.range_keys('2', 2023, 2023, 1, 3)
+        df = macro_form.parse_table(_fixture('result_2023.html'))
+        self.assertTrue(macro_store.save(self.url, '2', *keys, df))
+        self.assertTrue(macro_store.covered(self.url, '2', *keys))
+        loaded = macro_store.load(self.url, '2', *keys)
+        self.assertEqual(list(loaded.columns), ['Chỉ tiêu', 'T1/2023', 'T2/2023', 'T3/2023'])
+        self.assertAlmostEqual(loaded.loc[0, 'T3/2023'], 103.35)
+
+    def test_save_rejects_other_periods(self):
+        # Bảng kỳ mặc định (T10-T12/2024) không được ghi thay cho khoảng T1-T3/2023
+        keys = macro_store.range_keys('2', 2023, 2023, 1, 3)
+        df = macro_form.parse_table(_fixture('form.html'))
+        self.assertFalse(macro_store.save(self.url, '2', *keys, df))
+        self.assertFalse(macro_store.covered(self.url, '2', *keys))
+        self.assertTrue(macro_store.query(self.url, '2', 0, 999999).empty)
+
+    def test_to_number_uses_table_decimal_mark(self):
+        self.assertAlmostEqual(macro_store.to_number('1,234'), 1.234)
+        self.assertEqual(macro_store.to_number('1,234', '.'), 1234)
+        for text, expected in (('1.234,5', 1234.5), ('1,234.5', 1234.5), ('1.234.567', 1234567), ('3,2%', 3.2)):
+            self.assertAlmostEqual(macro_store.to_number(text), expected)
+
+        # '1,234' chỉ là phân nhóm hàng nghìn khi bảng dùng '.' làm dấu thập phân
+        for other, expected in (('2,5', 1.234), ('2.5', 1234), ('1.234.567', 1.234), ('1,234,567', 1234)):
+            df = pd.DataFrame({'Chỉ tiêu': ['A', 'B'], 'T1/2023': ['1,234', other], 'T2/2023': ['-', '1']})
+            long = macro_store.to_long(df)[2]
+            self.assertAlmostEqual(long['value'].iloc[0], expected)
+
+
+class IndicatorTests(SimpleTestCase):
+
+    def test_column_names_include_parameters(self):
+        close = np.linspace(10, 20, 40)
+        df = pd.DataFrame({'date': pd.bdate_range('2024-01-01', periods=40), 'open': close,
+                           'high': close + 1, 'low': close - 1, 'close': close, 'Volume': 100})
+        result = add_indicators(df, ['macd', 'macd:5:10:3', 'bbands', 'bbands:10'])
+        for column in ('macd_12_26_9', 'macd_signal_12_26_9', 'macd_hist_12_26_9', 'macd_5_10_3',
+                       'bb_middle_20', 'bb_upper_20', 'bb_lower_20', 'bb_middle_10'):
+            self.assertIn(column, result.columns)
+        self.assertFalse(np.allclose(result['bb_middle_10'].iloc[-1], result['bb_middle_20'].iloc[-1]))
+
+    def test_ema_matches_pandas_per_symbol(self):
+        rng = np.random.default_rng(1)
+        frames = {}
+        for symbol, length in (('AAA', 80), ('BBB', 3), ('CCC', 50)):
+            close = 20 + np.cumsum(rng.normal(0, 0.5, length))
+            close[rng.random(length) < 0.15] = np.nan
+            close[0] = np.nan
+            frames[symbol] = pd.DataFrame({'date': pd.bdate_range('2024-01-01', periods=length), 'open': close,
+                                           'high': close + 1, 'low': close - 1, 'close': close, 'Volume': 100})
+        panel = pd.concat(frames, names=['symbol', None]).reset_index(level=1, drop=True)
+        panel = panel.set_index('date', append=True).sample(frac=1, random_state=0)
+
+        result = add_indicators(panel, ['ema:5', 'ema:20', 'rsi'])
+        for symbol, frame in frames.items():
+            rows = result.xs(symbol, level='symbol').sort_index()
+            for span in (5, 20):
+                expected = frame['close'].ewm(span=span, adjust=False, min_periods=span).mean()
+                np.testing.assert_allclose(rows[f'ema_{span}'].to_numpy(), expected.to_numpy(), rtol=1e-10)
+            change = frame['close'].diff()
+            gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+            loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+            np.testing.assert_allclose(rows['rsi_14'].to_numpy(), (100 - 100 / (1 + gain / loss)).to_numpy(),
+                                       rtol=1e-10)
+
+
+class StockBatchViewTests(SimpleTestCase):
+
+    def test_rejects_malformed_dates(self):
+        for from_date, to_date in (('2026-13-01', '2026-12-31'), ('2026-01-01', '31/12/2026'),
+                                   ('2026-02-01', '2026-01-01')):
+            response = self.client.get('/stock-batch/', {'symbols': 'FPT', 'from_date': from_date, 'to_date': to_date},
+                                       HTTP_HOST='127.0.0.1')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', response.json())
+
+
+class _FakeResponse:
+
+    def __init__(self, payload):
+        self.status_code = 200
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class _FakeSession:
+    """Nguồn dữ liệu giả: có dữ liệu vào các ngày mà open_day(ngày) đúng, đếm số request"""
+
+    def __init__(self, open_day):
+        self.open_day = open_day
+        self.calls = 0
+
+    def _is_open(self, day):
+        self.calls += 1
+        return self.open_day(day)
+
+    def get(self, url, **kwargs):
+        day = date.fromisoformat(url.rsplit('=', 1)[1])
+        rows = [{'currencyName': 'US DOLLAR', 'currencyCode': 'USD', 'cash': '1', 'transfer': '2', 'sell': '3'}]
+        return _FakeResponse({'Data': rows if self._is_open(day) else []})
+
+    def post(self, url, data=None, **kwargs):
+        day_text = data['toDate']
+        day, month, year = (int(part) for part in day_text.split('/'))
+        rows = [{'Id': 1, 'TypeName': 'Vàng SJC 1L', 'BranchName': 'Hồ Chí Minh', 'BuyValue': 1.0, 'SellValue': 2.0}]
+        return _FakeResponse({'currentDate': day_text, 'data': rows if self._is_open(date(year, month, day)) else []})
+
+
+class CalendarProbeTests(_CacheDirMixin, SimpleTestCase):
+
+    def _patch_session(self, session):
+        patcher = mock.patch.object(finance_df.http_client, 'get_session', lambda name: session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exchange_rate_probes_one_day_per_closed_kind(self):
+        # Ngân hàng: thứ 2 - thứ 7 trừ ngày lễ. 2024 có 304 ngày mở theo quy tắc; chủ nhật và ngày lễ
+        # mỗi loại chỉ được hỏi thử một ngày
+        session = _FakeSession(lambda day: day.weekday() < 6 and day not in vn_calendar.holidays(day.year))
+        self._patch_session(session)
+        df = finance_df.exchange_rate('2024-01-01', '2024-12-31')
+        self.assertEqual(session.calls, 304 + 2)
+        self.assertEqual(df['Date'].nunique(), 304)
+
+        session.calls = 0
+        finance_df.exchange_rate('2024-01-01', '2024-12-31')
+        self.assertEqual(session.calls, 0)
+
+    def test_probe_learns_open_day_kind(self):
+        # SJC giả: mở cả chủ nhật, nghỉ lễ. Chủ nhật được thăm dò một ngày, lần sau hỏi các chủ nhật còn lại
+        session = _FakeSession(lambda day: day not in vn_calendar.holidays(day.year))
+        self._patch_session(session)
+        with mock.patch.object(finance_df.rate_limit, 'get_bucket', lambda host: mock.Mock()):
+            finance_df.gold_sjc('2024-01-01', '2024-12-31')
+            self.assertEqual(session.calls, 304 + 2)
+
+            session.calls = 0
+            df = finance_df.gold_sjc('2024-01-01', '2024-12-31')
+            sundays = sum(1 for day in pd.date_range('2024-01-01', '2024-12-31')
+                          if day.weekday() == 6 and day.date() not in vn_calendar.holidays(2024))
+            self.assertEqual(session.calls, sundays - 1)
+            self.assertEqual(df['Date'].nunique(), 304 + sundays)
+
+            session.calls = 0
+            finance_df.gold_sjc('2024-01-01', '2024-12-31')
+            self.assertEqual(session.calls, 0)
+
+
+
+
+class GoldStoreTests(_CacheDirMixin, SimpleTestCase):
+
+    @staticmethod
+    def _day(buy_hcm, buy_hn):
+        return [(1, 'SJC 1L', 'Hồ Chí Minh', buy_hcm, buy_hcm + 2), (2, 'SJC 1L', 'Hà Nội', buy_hn, None)]
+
+    def test_round_trip(self):
+        today = date.today().isoformat()
+        days = {
+            '2024-01-01': self._day(10, 20),
+            '2024-01-02': self._day(10, 20),
+            '2024-01-03': [],  # ngày không có dữ liệu giữa hai ngày cùng giá
+            '2024-01-04': self._day(10, 21),
+            '2024-01-05': self._day(11, 21),
+            '2024-01-08': self._day(11, 21),
+            '2024-01-09': self._day(10, 20),
+        }
+        # Lưu không theo thứ tự, lần sau lấp chỗ trống của lần trước; ngày hôm nay không được lưu
+        gold_store.save_days({key: days[key] for key in ('2024-01-01', '2024-01-05', '2024-01-09')})
+        gold_store.save_days({key: value for key, value in days.items() if key not in ('2024-01-01', '2024-01-09')}
+                             | {today: self._day(99, 99), '2024-01-10': None})
+
+        expected = pd.DataFrame(
+            [(row[2], row[1], row[0], day, row[3], row[4]) for day, rows in days.items() for row in rows],
+            columns=['branch', 'type_name', 'item_id', 'date', 'buy', 'sell'],
+        ).sort_values(['date', 'item_id'], ignore_index=True)
+        loaded = gold_store.load('2024-01-01', today)
+        pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+        pd.testing.assert_frame_equal(gold_store.load('2024-01-04', '2024-01-08'),
+                                      expected[expected['date'].between('2024-01-04', '2024-01-08')]
+                                      .reset_index(drop=True), check_dtype=False)
+
+        # Giá lặp lại trên các ngày có dữ liệu liên tiếp (ngày không có dữ liệu không cắt đoạn) được gộp lại:
+        # Hồ Chí Minh 10 (01-04), 11 (05-08), 10 (09); Hà Nội 20 (01-02), 21 (04-08), 20 (09)
+        conn = gold_store._connect()
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM gold_runs').fetchone()[0], 6)
+        self.assertEqual(gold_store.missing_dates(['2024-01-03', '2024-01-10', today]), ['2024-01-10', today])
+
+    def test_today_rows_use_api_date(self):
+        today = date.today()
+        session = mock.Mock()
+        session.post.return_value = _FakeResponse({'currentDate': '01/02/2024 10:15', 'data': [
+            {'Id': 1, 'TypeName': 'SJC 1L', 'BranchName': 'Hồ Chí Minh', 'BuyValue': 1.0, 'SellValue': 2.0}]})
+        with mock.patch.object(finance_df.http_client, 'get_session', lambda name: session), \
+                mock.patch.object(finance_df.rate_limit, 'get_bucket', lambda host: mock.Mock()), \
+                mock.patch.object(finance_df, '_calendar_dates', lambda *args: [today.isoformat()]):
+            df = finance_df.gold_sjc(today.isoformat(), today.isoformat(), calendar=None)
+        self.assertEqual(df['Date'].tolist(), [pd.Timestamp('2024-02-01')])
+        self.assertEqual(gold_store.missing_dates([today.isoformat()]), [today.isoformat()])
+
+
+def _bars(start, periods):
+    dates = pd.bdate_range(start, periods=periods)
+    bars = np.zeros(periods, dtype=ohlcv_store.OHLCV_DTYPE)
+    bars['date'] = dates.to_numpy().astype('M8[D]')
+    bars['close'] = np.arange(periods, dtype='f8') + 1
+    return bars
+
+
+class OhlcvStoreTests(_CacheDirMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ohlcv_store._mmaps.clear()
+        self.addCleanup(ohlcv_store._mmaps.clear)
+
+    def test_read_range(self):
+        ohlcv_store.append('AAA', _bars('2024-01-01', 10), '2024-01-12')
+        bars = ohlcv_store.read('AAA', '2024-01-03', '2024-01-09')
+        self.assertEqual([str(day) for day in bars['date']],
+                         ['2024-01-03', '2024-01-04', '2024-01-05', '2024-01-08', '2024-01-09'])
+        self.assertEqual(len(ohlcv_store.read('BBB')), 0)
+        self.assertEqual(ohlcv_store.meta('AAA'), {'checked_through': '2024-01-12'})
+
+    def test_append_writes_in_place(self):
+        first = _bars('2024-01-01', 10)
+        ohlcv_store.append('AAA', first, '2024-01-12')
+        data_path = ohlcv_store._paths('AAA')[0]
+        inode = os.stat(data_path).st_ino
+        before = ohlcv_store.read('AAA')
+
+        # Các phiên đã có bị bỏ qua, chỉ các phiên mới được ghi nối vào cùng file
+        ohlcv_store.append('AAA', np.concatenate([first[-3:], _bars('2024-01-15', 5)]), '2024-01-19')
+        self.assertEqual(os.stat(data_path).st_ino, inode)
+        bars = ohlcv_store.read('AAA')
+        self.assertEqual(len(bars), 15)
+        self.assertEqual(str(bars['date'][-1]), '2024-01-19')
+        np.testing.assert_array_equal(np.load(data_path), bars)
+        self.assertEqual(len(before), 10)
+
+    def test_lock_is_shared_across_processes(self):
+        with ohlcv_store.lock('AAA'):
+            # Mở file khóa riêng như một process khác
+            with open(ohlcv_store._paths('AAA')[2]) as file:
+                with self.assertRaises(BlockingIOError):
+                    ohlcv_store.fcntl.flock(file, ohlcv_store.fcntl.LOCK_EX | ohlcv_store.fcntl.LOCK_NB)
+        with open(ohlcv_store._paths('AAA')[2]) as file:
+            ohlcv_store.fcntl.flock(file, ohlcv_store.fcntl.LOCK_EX | ohlcv_store.fcntl.LOCK_NB)
+
+    def test_mmap_cache_evicts_least_recently_used(self):
+        for symbol in ('AAA', 'BBB', 'CCC'):
+            ohlcv_store.append(symbol, _bars('2024-01-01', 5), '2024-01-05')
+        with mock.patch.object(ohlcv_store, 'OHLCV_MMAP_CACHE_SIZE', 2):
+            ohlcv_store._mmaps.clear()
+            ohlcv_store.read('AAA')
+            ohlcv_store.read('BBB')
+            ohlcv_store.read('AAA')
+            ohlcv_store.read('CCC')
+        self.assertEqual(list(ohlcv_store._mmaps), ['AAA', 'CCC'])
+
+
+class CorrelationTests(_CacheDirMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(0)
+        dates = pd.bdate_range('2024-01-01', periods=60)
+        self.closes = pd.DataFrame(np.exp(np.cumsum(rng.normal(0, 0.02, (60, 5)), axis=0)) * 10,
+                                   index=dates, columns=['AAA', 'BBB', 'CCC', 'DDD', 'EEE'])
+        self.closes.iloc[10:15, 1] = np.nan
+        self.fetched = []
+        patches = [
+            mock.patch.object(correlation, '_closes', self._closes),
+            mock.patch.object(correlation, '_last_session', lambda: self.closes.index[-1].strftime('%Y-%m-%d')),
+            mock.patch.object(correlation, 'universe', lambda industry=None: ['AAA', 'BBB', 'CCC']),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        correlation._states.clear()
+        self.addCleanup(correlation._states.clear)
+
+    def _closes(self, symbols, fromdate, todate):
+        # Giả price_panel: ghi giá vào kho OHLCV như khi tải thật
+        self.fetched.append(list(symbols))
+        frame = self.closes.loc[fromdate:todate, list(symbols)]
+        for symbol in symbols:
+            column = frame[symbol].dropna()
+            bars = np.zeros(len(column), dtype=ohlcv_store.OHLCV_DTYPE)
+            bars['date'] = column.index.to_numpy().astype('M8[D]')
+            bars['close'] = column.to_numpy()
+            ohlcv_store.append(symbol, bars, todate)
+        return frame
+
+    def _expected(self, symbols):
+        returns = np.log(self.closes[symbols] / self.closes[symbols].shift())
+        return returns.corr(min_periods=2)
+
+    def test_request_path_reads_built_statistics(self):
+        with self.assertRaises(ValueError):
+            correlation.correlation_matrix(fromdate='2024-01-01')
+        correlation.build('2024-01-01')
+        self.fetched.clear()
+
+        result = correlation.correlation_matrix(fromdate='2024-01-01', min_periods=2)
+        pd.testing.assert_frame_equal(result, self._expected(['AAA', 'BBB', 'CCC']))
+        result = correlation.correlation_matrix(['CCC', 'AAA'], fromdate='2024-01-01', min_periods=2)
+        pd.testing.assert_frame_equal(result, self._expected(['AAA', 'CCC']))
+        self.assertEqual(self.fetched, [])
+
+    def test_custom_symbols_are_added_incrementally(self):
+        correlation.build('2024-01-01')
+        self.fetched.clear()
+
+        result = correlation.correlation_matrix(['AAA', 'DDD'], fromdate='2024-01-01', min_periods=2)
+        pd.testing.assert_frame_equal(result, self._expected(['AAA', 'DDD']))
+        self.fetched.clear()
+        result = correlation.correlation_matrix(['BBB', 'DDD', 'EEE'], fromdate='2024-01-01', min_periods=2)
+        pd.testing.assert_frame_equal(result, self._expected(['BBB', 'DDD', 'EEE']))
+        # Chỉ tải giá mã mới; các mã đã có đọc từ kho, thống kê ALL không đổi
+        self.assertEqual(self.fetched, [['BBB', 'EEE']])
+        self.assertEqual(correlation._load_state((correlation.ALL, '2024-01-01'))['symbols'].tolist(),
+                         ['AAA', 'BBB', 'CCC'])
+
+    def test_custom_symbols_are_bounded(self):
+        with mock.patch.object(correlation, 'CORRELATION_CUSTOM_MAX_SYMBOLS', 3):
+            correlation.correlation_matrix(['AAA', 'BBB'], fromdate='2024-01-01', min_periods=2)
+            correlation.correlation_matrix(['CCC'], fromdate='2024-01-01', min_periods=2)
+            result = correlation.correlation_matrix(['CCC', 'DDD'], fromdate='2024-01-01', min_periods=2)
+            with self.assertRaises(ValueError):
+                correlation.correlation_matrix(['AAA', 'BBB', 'CCC', 'DDD'], fromdate='2024-01-01')
+
+        pd.testing.assert_frame_equal(result, self._expected(['CCC', 'DDD']))
+        state = correlation._load_state((correlation.CUSTOM, '2024-01-01'))
+        self.assertEqual(len(state['symbols']), 3)
+        self.assertIn('CCC', state['symbols'].tolist())
+        self.assertIn('DDD', state['symbols'].tolist())
+
+
+class RatioTests(_CacheDirMixin, SimpleTestCase):
+
+    def _load_fixture(self):
+        with open(os.path.join(RATIOS_TESTDATA, 'store.json'), encoding='utf-8') as f:
+            fixture = json.load(f)
+        for key, rows in fixture['layouts'].items():
+            layout_store.save(key, pd.DataFrame(rows, columns=['itemCode', 'Name']))
+        values = pd.DataFrame(fixture['values'], columns=['symbol', 'report_type', 'statement', 'fiscalDate',
+                                                          'itemCode', 'modelType', 'numericValue'])
+        for (symbol, report_type, statement), df in values.groupby(['symbol', 'report_type', 'statement']):
+            statement_store.save(symbol, report_type, statement, sorted(df['fiscalDate'].unique()), df)
+
+    def test_empty_store(self):
+        table = ratios.ratio_table()
+        self.assertTrue(table.empty)
+        self.assertEqual(table.columns.tolist(), ratios.RATIOS)
+        response = self.client.get('/financial-ratios/', HTTP_HOST='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_ratios_from_stored_statements(self):
+        self._load_fixture()
+        table = ratios.ratio_table()
+        self.assertEqual(table.index.tolist(), [('AAA', pd.Timestamp('2023-12-31')), ('AAA', pd.Timestamp('2024-12-31')),
+                                                ('VCB', pd.Timestamp('2024-12-31'))])
+        nan = np.nan
+        expected = {
+            # Mẫu dòng của doanh nghiệp thường không có "nợ ngắn hạn": current_ratio là NaN
+            ('AAA', '2023-12-31'): [0.1, 0.04, 0.25, 0.2, 1.5, nan, nan, nan, nan, nan],
+            ('AAA', '2024-12-31'): [0.1, 0.04, 0.25, 0.2, 1.5, nan, 0.25, 0.25, 0.25, 0.25],
+            # Ngân hàng: tỷ trọng thu nhập lãi thuần và tỷ lệ cho vay / tiền gửi
+            ('VCB', '2024-12-31'): [0.15, 0.015, 0.75, 0.375, 9.0, 0.8, nan, nan, nan, nan],
+        }
+        for (symbol, fiscal_date), values in expected.items():
+            np.testing.assert_allclose(table.loc[(symbol, pd.Timestamp(fiscal_date))].to_numpy(), values)
+
+    def test_view(self):
+        self._load_fixture()
+        response = self.client.get('/financial-ratios/', {'symbols': 'aaa'}, HTTP_HOST='127.0.0.1')
+        self.assertEqual(response.status_code, 200)
+        records = response.json()
+        self.assertEqual([record['fiscalDate'] for record in records], ['2023-12-31', '2024-12-31'])
+        self.assertIsNone(records[1]['current_ratio'])
+        response = self.client.get('/financial-ratios/', {'report_type': 'monthly'}, HTTP_HOST='127.0.0.1')
+        self.assertEqual(response.status_code, 400)
+
+
+class OwnershipGraphTests(_CacheDirMixin, SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        unlisted = ownership_graph.node_key(None, 'Công ty X')
+        holdings = [
+            ('AAA', 'BBB', 60), ('AAA', 'BBB', 20),  # trùng cặp: giữ tỷ lệ lớn nhất
+            ('BBB', 'CCC', 55),  # AAA kiểm soát CCC qua BBB
+            ('AAA', 'DDD', 30), ('CCC', 'DDD', 25),  # nhóm AAA cùng nắm 55% DDD
+            ('DDD', 'AAA', 10),  # sở hữu vòng
+            ('BBB', unlisted, 40),
+            ('BBB', 'DDD', 150), ('AAA', 'AAA', 5),  # tỷ lệ lỗi và tự sở hữu bị bỏ
+        ]
+        edges = pd.DataFrame(holdings, columns=['parent', 'child', 'percentage'])
+        edges['child_symbol'] = np.where(edges['child'] == unlisted, None, edges['child'])
+        edges['child_name'] = np.where(edges['child'] == unlisted, 'Công ty X', None)
+        edges['charter_capital'] = 1e9
+        with mock.patch.object(ownership_graph.listing_index, 'get_index',
+                               lambda: mock.Mock(**{'get.return_value': None})):
+            self.graph = ownership_graph.build(edges, built_at=0)
+        self.unlisted = unlisted
+
+    def test_csr(self):
+        self.assertEqual(self.graph.keys.tolist(), ['AAA', 'BBB', 'CCC', 'DDD', self.unlisted])
+        self.assertEqual(self.graph.indptr.tolist(), [0, 2, 4, 5, 6, 6])
+        self.assertEqual(self.graph.indices.tolist(), [1, 3, 2, 4, 3, 0])
+        np.testing.assert_allclose(self.graph.weights, [0.6, 0.3, 0.55, 0.4, 0.25, 0.1])
+        self.assertTrue(self.graph.subsidiaries('Công ty X').empty)
+
+        self.graph.save(storage.cache_path(ownership_graph.GRAPH_NAME))
+        with mock.patch.object(ownership_graph, '_graph', None):
+            loaded = ownership_graph.get_graph()
+        np.testing.assert_array_equal(loaded.indices, self.graph.indices)
+        np.testing.assert_allclose(loaded.weights, self.graph.weights)
+
+    def test_controlled_follows_chains_and_cycles(self):
+        result = self.graph.controlled('AAA', hops=5, threshold=0.5)
+        self.assertEqual(result['key'].tolist(), ['BBB', 'CCC', 'DDD'])
+        self.assertEqual(result['hops'].tolist(), [1, 2, 3])
+        np.testing.assert_allclose(result['held'], [0.6, 0.55, 0.55])
+        self.assertEqual(self.graph.controlled('AAA', hops=2, threshold=0.5)['key'].tolist(), ['BBB', 'CCC'])
+
+    def test_effective_ownership(self):
+        # Tổng tích tỷ lệ theo mọi đường đi tối đa 4 bước, kể cả đường đi vòng qua DDD -> AAA
+        result = self.graph.effective_ownership('AAA', hops=4)
+        self.assertEqual(result['key'].tolist(), ['BBB', 'DDD', 'CCC', self.unlisted])
+        np.testing.assert_allclose(result['effective'], [
+            0.6 + 0.3 * 0.1 * 0.6,
+            0.3 + 0.6 * 0.55 * 0.25 + 0.3 * 0.1 * 0.3,
+            0.6 * 0.55 + 0.3 * 0.1 * 0.6 * 0.55,
+            0.6 * 0.4 + 0.3 * 0.1 * 0.6 * 0.4,
+        ])
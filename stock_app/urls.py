@@ -3,7 +3,13 @@ from . import views
 
 urlpatterns = [
     path('', views.get_stock_data),
+    path('stock-batch/', views.stock_batch),
+    path('stock-correlation/', views.stock_correlation),
+    path('symbol-search/', views.symbol_search),
+    path('company-profile/', views.company_profile),
+    path('ownership/', views.ownership),
     path('gold/', views.gold),  
     path('financial-statement/', views.financial_statement),
+    path('financial-ratios/', views.financial_ratios),
     path('exchange-rate/', views.forex),
 ]
@@ -1,6 +1,8 @@
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 import io
+import json
+from datetime import datetime
 import pandas as pd
 import sys
 from pathlib import Path
@@ -9,6 +11,24 @@ import io
 # Import hàm price_stock từ file finance_df.py
 from stock_app.static.finance_py.finance_df import *
 from stock_app.static.finance_py.const import *
+from stock_app.static.finance_py.company_profile import SOURCES as PROFILE_SOURCES, profile
+from stock_app.static.finance_py.correlation import correlation_matrix
+from stock_app.static.finance_py.indicators import add_indicators
+from stock_app.static.finance_py.listing_index import get_index
+from stock_app.static.finance_py.ownership_graph import get_graph
+from stock_app.static.finance_py.ratios import ratio_table
+from stock_app.static.finance_py.resample import resample_ohlcv
+from stock_app.static.finance_py.statement_labels import BANK_SYMBOLS
+
+# Các cột giá cơ bản của price_stock() sau khi gộp nến, các cột còn lại là chỉ báo
+PRICE_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'Volume', 'VWAP')
+
+def _records(df):
+    # Chuyển các cột ngày (datetime64) thành chuỗi YYYY-MM-DD trước khi hiển thị
+    df = df.copy()
+    for column in df.select_dtypes(include='datetime').columns:
+        df[column] = df[column].dt.strftime('%Y-%m-%d')
+    return df.to_dict('records')
 
 def gold(request):
     if request.method == "POST":
@@ -36,7 +56,7 @@ def gold(request):
             })
 
         if action == "get_data":
-            data_list = df.to_dict('records')
+            data_list = _records(df)
             return render(request, 'pages/gold.html', {
                 'data': data_list,
                 'from_date': fromdate,
@@ -58,6 +78,7 @@ def gold(request):
                 path_or_buf=output,
                 index=False,
                 sep=",",  # Sử dụng dấu phẩy là chuẩn CSV
+                date_format="%Y-%m-%d",
                 encoding="utf-8-sig"
             )
             
@@ -72,6 +93,9 @@ def get_stock_data(request):
         from_date = request.POST.get('from_date')
         to_date = request.POST.get('to_date')
         file_from_date = request.POST.get('file_from_date')
+        period = request.POST.get('period', 'D')
+        anchor = request.POST.get('anchor', 'calendar')
+        indicators = request.POST.getlist('indicators')
         action = request.POST.get('action')
         # Validate required fields
         if not symbol or not from_date or not to_date:
@@ -81,11 +105,18 @@ def get_stock_data(request):
                 'symbol': symbol,
                 'from_date': from_date,
                 'to_date': to_date,
+                'period': period,
+                'anchor': anchor,
+                'indicators': indicators,
             })
 
         # Fetch stock data
         try:
             df = price_stock(symbol, from_date, to_date)
+            # Gộp nến theo tuần / tháng / quý nếu được chọn
+            df = resample_ohlcv(df, period, anchor)
+            # Tính các chỉ báo kỹ thuật được chọn ở phía server
+            df = add_indicators(df, indicators)
         except Exception as e:
             error_msg = f"Error fetching data: {str(e)}"
             return render(request, 'pages/home.html', {
@@ -93,6 +124,9 @@ def get_stock_data(request):
                 'symbol': symbol,
                 'from_date': from_date,
                 'to_date': to_date,
+                'period': period,
+                'anchor': anchor,
+                'indicators': indicators,
             })
 
         # No data found
@@ -103,15 +137,25 @@ def get_stock_data(request):
                 'symbol': symbol,
                 'from_date': from_date,
                 'to_date': to_date,
+                'period': period,
+                'anchor': anchor,
+                'indicators': indicators,
             })
 
         if action == "get_data":
-            data_list = df.to_dict('records')
+            data_list = _records(df)
+            indicator_columns = [column for column in df.columns if column not in PRICE_COLUMNS]
+            for row in data_list:
+                row['indicator_values'] = [row[column] for column in indicator_columns]
             return render(request, 'pages/home.html', {
                 'data': data_list,
+                'indicator_columns': indicator_columns,
                 'symbol': symbol,
                 'from_date': from_date,
                 'to_date': to_date,
+                'period': period,
+                'anchor': anchor,
+                'indicators': indicators,
             })
 
         elif action == "download":
@@ -129,6 +173,7 @@ def get_stock_data(request):
                 path_or_buf=output,
                 index=False,
                 sep=",",  # Sử dụng dấu phẩy là chuẩn CSV
+                date_format="%Y-%m-%d",
                 encoding="utf-8-sig"
             )
             
@@ -137,6 +182,186 @@ def get_stock_data(request):
             return response
     return render(request, 'pages/home.html')
 
+def stock_batch(request):
+    # Nhận tham số từ POST hoặc GET để có thể gọi từ script
+    params = request.POST if request.method == "POST" else request.GET
+    symbols = params.get('symbols', '')
+    industry = params.get('industry', '').strip()
+    from_date = params.get('from_date')
+    to_date = params.get('to_date')
+    layout = params.get('layout', 'long')
+    output = params.get('format', 'json')
+    period = params.get('period', 'D')
+    anchor = params.get('anchor', 'calendar')
+    indicators = [name for name in params.get('indicators', '').split(",") if name.strip()]
+
+    # Validate required fields
+    if not (symbols or industry) or not from_date or not to_date:
+        return JsonResponse({'error': 'Please fill in Symbols (or Industry), From Date, and To Date!'}, status=400)
+    if layout not in ('long', 'wide') or output not in ('json', 'csv'):
+        return JsonResponse({'error': 'Invalid layout or format parameter.'}, status=400)
+    try:
+        if datetime.strptime(from_date, '%Y-%m-%d') > datetime.strptime(to_date, '%Y-%m-%d'):
+            return JsonResponse({'error': 'From Date must not be after To Date.'}, status=400)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date, expected YYYY-MM-DD.'}, status=400)
+
+    # Fetch stock data
+    try:
+        symbol_list = [code for code in symbols.split(",") if code.strip()]
+        if industry:
+            symbol_list += industry_symbols(industry)
+        df = price_panel(symbol_list, from_date, to_date, layout=layout, period=period, anchor=anchor,
+                         indicators=indicators)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f"Error fetching data: {str(e)}"}, status=500)
+
+    # No data found
+    if df.empty:
+        return JsonResponse({'error': 'No data found in the given date range!'}, status=404)
+
+    if output == "csv":
+        # Tạo file CSV
+        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
+        response['Content-Disposition'] = 'attachment; filename="stock_panel.csv"'
+        output_csv = io.StringIO()
+        df.to_csv(path_or_buf=output_csv, sep=",", date_format="%Y-%m-%d", encoding="utf-8-sig")
+        response.write(output_csv.getvalue())
+        return response
+
+    # JSON: dạng long là danh sách bản ghi, dạng wide là bảng (index, columns, data)
+    if layout == "long":
+        df = df.reset_index()
+        df['date'] = df['date'].dt.strftime('%Y-%m-%d')
+        content = df.to_json(orient='records')
+    else:
+        df.index = df.index.strftime('%Y-%m-%d')
+        content = df.to_json(orient='split')
+    return HttpResponse(content, content_type="application/json")
+
+def stock_correlation(request):
+    # Ma trận tương quan / hiệp phương sai lợi suất theo ngày, mặc định cho toàn bộ mã niêm yết
+    params = request.POST if request.method == "POST" else request.GET
+    symbols = params.get('symbols', '')
+    industry = params.get('industry', '').strip()
+    from_date = params.get('from_date') or None
+    kind = params.get('kind', 'corr')
+    output = params.get('format', 'json')
+
+    if output not in ('json', 'csv'):
+        return JsonResponse({'error': 'Invalid format parameter.'}, status=400)
+    try:
+        min_periods = int(params.get('min_periods', 20))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid min_periods parameter.'}, status=400)
+
+    try:
+        symbol_list = [code for code in symbols.split(",") if code.strip()] or None
+        df = correlation_matrix(symbol_list, from_date, kind=kind, min_periods=min_periods, industry=industry or None)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': f"Error computing {kind}: {str(e)}"}, status=500)
+
+    if output == "csv":
+        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
+        response['Content-Disposition'] = f'attachment; filename="stock_{kind}.csv"'
+        output_csv = io.StringIO()
+        df.to_csv(path_or_buf=output_csv, sep=",", encoding="utf-8-sig")
+        response.write(output_csv.getvalue())
+        return response
+    return HttpResponse(df.to_json(orient='split'), content_type="application/json")
+
+def symbol_search(request):
+    # Gợi ý mã cho ô nhập Symbol: chỉ đọc chỉ mục trong bộ nhớ, không gọi vietcap trên request
+    query = request.GET.get('q', '').strip()
+    board = request.GET.get('board', '').strip() or None
+    industry = request.GET.get('industry', '').strip() or None
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit parameter.'}, status=400)
+
+    results = get_index(wait=False).search(query, limit=limit, board=board, industry=industry)
+    return JsonResponse({'results': [
+        {'symbol': row['symbol'], 'organName': row['organName'], 'board': row['board']} for row in results
+    ]})
+
+def company_profile(request):
+    # Hồ sơ công ty (tổng quan, công ty con, cổ đông) tải song song, nguồn chậm dùng bản đã lưu
+    symbol = request.GET.get('symbol', '').strip()
+    if not symbol:
+        return JsonResponse({'error': 'Please fill in Symbol!'}, status=400)
+
+    result = profile(symbol)
+    content = {'symbol': result['symbol'], 'stale': result['stale'], 'errors': result['errors']}
+    for source in PROFILE_SOURCES:
+        df = result[source]
+        content[source] = None if df is None else json.loads(df.to_json(orient='records', date_format='iso'))
+    return JsonResponse(content)
+
+def ownership(request):
+    # Tra cứu đồ thị sở hữu chéo đã dựng sẵn (build_ownership_graph), không gọi SSI
+    symbol = request.GET.get('symbol', '').strip()
+    query = request.GET.get('query', 'effective')
+    if not symbol:
+        return JsonResponse({'error': 'Please fill in Symbol!'}, status=400)
+    if query not in ('subsidiaries', 'controlled', 'effective'):
+        return JsonResponse({'error': 'Invalid query parameter.'}, status=400)
+    try:
+        hops = int(request.GET.get('hops', OWNERSHIP_MAX_HOPS))
+        threshold = float(request.GET.get('threshold', OWNERSHIP_CONTROL_THRESHOLD))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid hops or threshold parameter.'}, status=400)
+
+    try:
+        graph = get_graph()
+        if query == 'subsidiaries':
+            df = graph.subsidiaries(symbol)
+        elif query == 'controlled':
+            df = graph.controlled(symbol, hops=hops, threshold=threshold)
+        else:
+            df = graph.effective_ownership(symbol, hops=hops)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+    return HttpResponse(df.to_json(orient='records', force_ascii=False), content_type="application/json")
+
+def financial_ratios(request):
+    # Chỉ số tài chính (ROE, ROA, biên lợi nhuận, ...) tính từ báo cáo đã lưu trong kho, không gọi vndirect
+    params = request.POST if request.method == "POST" else request.GET
+    symbols = [code.strip().upper() for code in params.get('symbols', '').split(",") if code.strip()] or None
+    report_type = params.get('report_type', 'ANNUAL').upper()
+    from_date = params.get('from_date') or None
+    to_date = params.get('to_date') or None
+    output = params.get('format', 'json')
+
+    if output not in ('json', 'csv'):
+        return JsonResponse({'error': 'Invalid format parameter.'}, status=400)
+    try:
+        df = ratio_table(report_type, symbols, from_date, to_date).reset_index()
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    df['fiscalDate'] = df['fiscalDate'].dt.strftime('%Y-%m-%d')
+
+    if output == "csv":
+        response = HttpResponse(content_type="text/csv; charset=utf-8-sig")
+        response['Content-Disposition'] = 'attachment; filename="financial_ratios.csv"'
+        output_csv = io.StringIO()
+        df.to_csv(path_or_buf=output_csv, index=False, sep=",", encoding="utf-8-sig")
+        response.write(output_csv.getvalue())
+        return response
+    return HttpResponse(df.to_json(orient='records'), content_type="application/json")
+
+def _flatten_peers(df):
+    # Bảng so sánh nhiều mã: một cột Name và các cột "MÃ Kỳ"
+    if df.empty:
+        return df
+    df = df.reset_index(level='itemCode', drop=True)
+    df.columns = [f"{symbol} {period}" for symbol, period in df.columns]
+    return df.reset_index()
+
 def financial_statement(request):
     if request.method == "POST":
         symbol = request.POST.get('symbol')
@@ -156,7 +381,14 @@ def financial_statement(request):
                 'timely': timely,
             })
         
-        df = financial_report(symbol, type, year, timely)
+        # Nhiều mã (cách nhau bởi dấu phẩy) hoặc "banks" thì so sánh các mã cạnh nhau
+        symbol_list = [code.strip() for code in symbol.split(",") if code.strip()]
+        if symbol.strip().upper() == 'BANKS':
+            symbol_list = sorted(BANK_SYMBOLS)
+        if len(symbol_list) > 1:
+            df = _flatten_peers(financial_report_peers(symbol_list, type, year, timely))
+        else:
+            df = financial_report(symbol, type, year, timely)
 
         # No data found
         if df.empty:
@@ -171,7 +403,7 @@ def financial_statement(request):
 
         # Handle action: get_data
         if action == "get_data":
-            data_list = df.to_dict('records')
+            data_list = _records(df)
             return render(request, 'pages/fs.html', {
                 'data': data_list,
                 'symbol': symbol,
@@ -196,6 +428,7 @@ def financial_statement(request):
                 path_or_buf=output,
                 index=False,
                 sep=",",  # Sử dụng dấu phẩy là chuẩn CSV
+                date_format="%Y-%m-%d",
                 encoding="utf-8-sig"
             )
             
@@ -309,7 +542,7 @@ def forex(request):
             })
 
         if action == "get_data":
-            data_list = df.to_dict('records')
+            data_list = _records(df)
             return render(request, 'pages/forex.html', {
                 'data': data_list,
                 'from_date': fromdate,
@@ -332,6 +565,7 @@ def forex(request):
                 path_or_buf=output,
                 index=False,
                 sep=",", 
+                date_format="%Y-%m-%d",
                 encoding="utf-8-sig"
             )
             response.write(output.getvalue())